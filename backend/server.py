@@ -1,14 +1,19 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne, ReturnDocument
+from cachetools import TTLCache
 import os
+import asyncio
+import hashlib
+import json
 import logging
 import warnings
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Union, Callable
 import uuid
 from uuid import uuid4
 from datetime import datetime, timezone, timedelta
@@ -17,7 +22,7 @@ import jwt
 from jwt.exceptions import InvalidTokenError
 import io
 import pandas as pd
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse
 import base64
 import mimetypes
 import firebase_admin
@@ -190,6 +195,8 @@ class Visitor(BaseModel):
     age_range: Optional[str] = None  # "13-18 ans", "18-25 ans", etc.
     visit_date: str
     assigned_month: str  # "2025-01"
+    promo_year: Optional[int] = None  # Décomposition indexée de assigned_month
+    promo_month: Optional[str] = None  # "01" à "12"
     presences_dimanche: List[PresenceEntry] = Field(default_factory=list)
     presences_jeudi: List[PresenceEntry] = Field(default_factory=list)
     formation_pcnc: bool = False
@@ -204,6 +211,18 @@ class Visitor(BaseModel):
     ejp: bool = False  # Église des Jeunes Prodiges
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+def promo_fields(assigned_month: Optional[str]) -> Dict[str, Any]:
+    """Décompose assigned_month ("2025-01") en champs indexés promo_year / promo_month"""
+    try:
+        year, month = str(assigned_month).split("-")[:2]
+        return {"promo_year": int(year), "promo_month": month.zfill(2)}
+    except (ValueError, AttributeError):
+        return {"promo_year": None, "promo_month": None}
+
+def promo_month_part(assigned_month: str) -> str:
+    """Mois ("08") d'un assigned_month utilisateur ("2024-08" ou "08")"""
+    return assigned_month.split("-")[-1].strip().zfill(2)
+
 class VisitorCreate(BaseModel):
     firstname: str
     lastname: str
@@ -537,6 +556,282 @@ class RSVP(BaseModel):
     reponse: str  # "oui", "non", "peut_etre"
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+# ==================== RESPONSE CACHES ====================
+
+# Caches TTL en mémoire (par processus) pour les vues statistiques coûteuses.
+# Les écritures concernées invalident explicitement leurs entrées.
+RESPONSE_CACHES: Dict[str, TTLCache] = {}
+
+def response_cache(name: str, ttl: int = 300, maxsize: int = 256) -> TTLCache:
+    """Retourne (en le créant au besoin) le cache nommé"""
+    if name not in RESPONSE_CACHES:
+        RESPONSE_CACHES[name] = TTLCache(maxsize=maxsize, ttl=ttl)
+    return RESPONSE_CACHES[name]
+
+def invalidate_cache(name: str, match: Optional[Callable[[Any], bool]] = None):
+    """Vide un cache nommé, ou seulement les clés pour lesquelles match(key) est vrai"""
+    cache = RESPONSE_CACHES.get(name)
+    if cache is None:
+        return
+    if match is None:
+        cache.clear()
+        return
+    for key in [k for k in list(cache.keys()) if match(k)]:
+        cache.pop(key, None)
+
+def etag_response(request: Request, payload: Any) -> Response:
+    """Réponse JSON avec ETag; 304 si le client possède déjà cette version"""
+    digest = hashlib.md5(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=payload, headers=headers)
+
+# ==================== DATABASE INDEXES ====================
+
+# Registre déclaratif des index MongoDB, appliqué au démarrage (idempotent).
+# Les index uniques sur "id" sont partiels pour tolérer d'anciens documents sans id.
+UNIQUE_ID = {"keys": [("id", 1)], "unique": True, "partial": {"id": {"$exists": True}}}
+
+DB_INDEXES: Dict[str, List[Dict[str, Any]]] = {
+    "users": [
+        UNIQUE_ID,
+        {"keys": [("username", 1), ("city", 1)]},
+        {"keys": [("role", 1), ("city", 1)]},
+    ],
+    "visitors": [
+        UNIQUE_ID,
+        {"keys": [("city", 1), ("tracking_stopped", 1), ("assigned_month", 1)]},
+        {"keys": [("assigned_month", 1)]},
+        {"keys": [("city", 1), ("promo_month", 1), ("promo_year", 1)]},
+        {"keys": [("presences_dimanche.date", 1)]},
+    ],
+    "cities": [UNIQUE_ID, {"keys": [("name", 1)]}],
+    "secteurs": [UNIQUE_ID, {"keys": [("ville", 1)]}],
+    "familles_impact": [UNIQUE_ID, {"keys": [("ville", 1)]}, {"keys": [("secteur_id", 1)]}],
+    "membres_fi": [UNIQUE_ID, {"keys": [("fi_id", 1)]}, {"keys": [("nouveau_arrivant_id", 1)]}],
+    "presences_fi": [UNIQUE_ID, {"keys": [("membre_fi_id", 1), ("date", 1)]}, {"keys": [("fi_id", 1), ("date", 1)]}],
+    "berger_presences": [{"keys": [("berger_id", 1), ("date", 1)]}, {"keys": [("ville", 1), ("created_at", -1)]}],
+    "kpi_discipolat": [{"keys": [("visitor_id", 1), ("mois", 1)]}],
+    "kpi_membres_bergerie": [{"keys": [("membre_id", 1), ("mois", 1)]}],
+    "culte_stats": [UNIQUE_ID, {"keys": [("ville", 1), ("date", 1)]}],
+    "evangelisation": [{"keys": [("ville", 1), ("date", 1)]}],
+    "notifications": [UNIQUE_ID, {"keys": [("user_id", 1), ("created_at", -1)]}],
+    "stars": [
+        UNIQUE_ID,
+        {"keys": [("ville", 1)]},
+        {"keys": [("departements", 1)]},
+        {"keys": [("birthday_doy", 1)]},
+        {"keys": [("ville", 1), ("birthday_doy", 1)]},
+    ],
+    "stars_planning": [UNIQUE_ID, {"keys": [("annee", 1), ("semaine", 1), ("departement", 1)]}],
+    "stars_assignments": [
+        {"keys": [("star_id", 1), ("annee", 1), ("semaine", 1)]},
+        {"keys": [("departement", 1), ("annee", 1), ("semaine", 1)]},
+    ],
+    "bergerie_contacts": [UNIQUE_ID, {"keys": [("ville", 1), ("bergerie_month", 1)]}],
+    "bergerie_objectifs": [{"keys": [("ville", 1), ("bergerie_month", 1)]}],
+    "bergerie_disciples": [{"keys": [("visitor_id", 1)]}, {"keys": [("ville", 1), ("bergerie_month", 1)]}],
+    "bergeries_disciples": [UNIQUE_ID],
+    "membres_disciples": [UNIQUE_ID, {"keys": [("bergerie_id", 1)]}],
+    "fcm_tokens": [{"keys": [("user_id", 1)]}],
+    "visitor_presences": [
+        {"keys": [("visitor_id", 1), ("date", 1), ("type", 1)], "unique": True},
+        {"keys": [("date", 1), ("type", 1)]},
+    ],
+    "schema_migrations": [{"keys": [("name", 1)], "unique": True}],
+    "promo_rollups": [{"keys": [("city", 1), ("assigned_month", 1), ("presence_month", 1)], "unique": True}],
+    "projets": [UNIQUE_ID],
+    "taches": [UNIQUE_ID],
+    "church_events": [UNIQUE_ID],
+    "campagnes_communication": [UNIQUE_ID],
+}
+
+def index_name(keys: List[tuple]) -> str:
+    """Nom d'index au format par défaut de MongoDB (champ_direction)"""
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+def index_options_differ(spec: Dict[str, Any], info: Dict[str, Any]) -> bool:
+    """Vrai si un index existant n'a plus les options (unique, filtre partiel) déclarées"""
+    return (
+        bool(info.get("unique")) != bool(spec.get("unique"))
+        or (info.get("partialFilterExpression") or None) != (spec.get("partial") or None)
+    )
+
+async def ensure_indexes() -> Dict[str, Any]:
+    """Crée les index déclarés dans DB_INDEXES; recrée ceux dont les options ont changé"""
+    created = []
+    replaced = []
+    errors = []
+    for collection_name, specs in DB_INDEXES.items():
+        existing = await db[collection_name].index_information()
+        for spec in specs:
+            name = index_name(spec["keys"])
+            options = {"name": name, "background": True}
+            if spec.get("unique"):
+                options["unique"] = True
+            if spec.get("partial"):
+                options["partialFilterExpression"] = spec["partial"]
+            try:
+                # Même nom mais options différentes : create_index échouerait, on remplace
+                if name in existing and index_options_differ(spec, existing[name]):
+                    await db[collection_name].drop_index(name)
+                    replaced.append(f"{collection_name}.{name}")
+                await db[collection_name].create_index(spec["keys"], **options)
+                created.append(f"{collection_name}.{name}")
+            except Exception as e:
+                errors.append({"collection": collection_name, "index": name, "error": str(e)})
+    return {"ensured": created, "replaced": replaced, "errors": errors}
+
+async def get_index_report() -> Dict[str, Any]:
+    """Compare les index déclarés aux index présents et liste les index jamais utilisés"""
+    missing = []
+    mismatched = []
+    unused = []
+    undeclared = []
+    for collection_name, specs in DB_INDEXES.items():
+        declared = {index_name(spec["keys"]) for spec in specs}
+        existing = await db[collection_name].index_information()
+        missing.extend(
+            {"collection": collection_name, "index": name}
+            for name in sorted(declared - set(existing))
+        )
+        mismatched.extend(
+            {"collection": collection_name, "index": index_name(spec["keys"])}
+            for spec in specs
+            if index_name(spec["keys"]) in existing
+            and index_options_differ(spec, existing[index_name(spec["keys"])])
+        )
+        undeclared.extend(
+            {"collection": collection_name, "index": name}
+            for name in sorted(set(existing) - declared - {"_id_"})
+        )
+        try:
+            usage = await db[collection_name].aggregate([{"$indexStats": {}}]).to_list(length=None)
+        except Exception:
+            usage = []
+        for stat in usage:
+            if stat["name"] != "_id_" and stat.get("accesses", {}).get("ops", 0) == 0:
+                unused.append({
+                    "collection": collection_name,
+                    "index": stat["name"],
+                    "since": str(stat.get("accesses", {}).get("since", ""))
+                })
+    return {"missing": missing, "mismatched": mismatched, "unused": unused, "undeclared": undeclared}
+
+# ==================== DATA MIGRATIONS ====================
+
+# Migrations de données one-shot, exécutées une seule fois au démarrage
+# (l'historique est conservé dans la collection schema_migrations).
+DATA_MIGRATIONS: List[Dict[str, Any]] = []
+
+def data_migration(name: str):
+    """Décorateur enregistrant une migration de données one-shot"""
+    def decorator(func):
+        DATA_MIGRATIONS.append({"name": name, "func": func})
+        return func
+    return decorator
+
+async def run_pending_migrations(force: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Exécute les migrations pas encore appliquées (ou forcées) dans l'ordre de déclaration"""
+    force = force or []
+    results = []
+    for migration in DATA_MIGRATIONS:
+        name = migration["name"]
+        already_done = await db.schema_migrations.find_one({"name": name})
+        if already_done and name not in force:
+            continue
+        details = await migration["func"]()
+        await db.schema_migrations.update_one(
+            {"name": name},
+            {"$set": {
+                "name": name,
+                "applied_at": datetime.now(timezone.utc).isoformat(),
+                "details": details
+            }},
+            upsert=True
+        )
+        results.append({"name": name, "details": details})
+    return results
+
+# ---------- Dates canoniques ----------
+# Jours ("date", "visit_date") : "YYYY-MM-DD"
+# Horodatages ("created_at", "date_ajout") : ISO 8601 UTC ("2025-03-02T10:00:00+00:00")
+# Les deux formats se trient lexicographiquement et supportent les filtres $gte/$lt.
+
+def canonical_day(value: Any) -> Any:
+    """Normalise un jour en "YYYY-MM-DD" (valeur inchangée si non reconnue)"""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+        try:
+            return datetime.strptime(value, "%d/%m/%Y").strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    return value
+
+def canonical_timestamp(value: Any) -> Any:
+    """Normalise un horodatage en ISO 8601 UTC (valeur inchangée si non reconnue)"""
+    if isinstance(value, str) and value:
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat()
+    return value
+
+def period_range(year: Optional[int], month: Optional[int] = None) -> Optional[Dict[str, str]]:
+    """Filtre {$gte, $lt} couvrant une année ou un mois, sur des dates canoniques"""
+    if not year:
+        return None
+    if month:
+        start = f"{year}-{month:02d}-01"
+        end = f"{year + 1}-01-01" if month == 12 else f"{year}-{month + 1:02d}-01"
+    else:
+        start = f"{year}-01-01"
+        end = f"{year + 1}-01-01"
+    return {"$gte": start, "$lt": end}
+
+CANONICAL_DATE_FIELDS = {
+    "visitors": {"visit_date": canonical_day, "created_at": canonical_timestamp},
+    "culte_stats": {"date": canonical_day, "created_at": canonical_timestamp},
+    "presences_fi": {"date": canonical_day, "created_at": canonical_timestamp},
+    "evangelisation": {"date": canonical_day, "created_at": canonical_timestamp},
+    "berger_presences": {"date": canonical_day, "created_at": canonical_timestamp},
+    "membres_fi": {"date_ajout": canonical_timestamp},
+}
+
+@data_migration("canonical_date_strings")
+async def migrate_canonical_dates():
+    """Réécrit date / visit_date / created_at / date_ajout au format canonique"""
+    updated = {}
+    for collection_name, fields in CANONICAL_DATE_FIELDS.items():
+        projection = {field: 1 for field in fields}
+        operations = []
+        async for doc in db[collection_name].find({}, projection):
+            changes = {}
+            for field, normalize in fields.items():
+                if doc.get(field) is None:
+                    continue
+                value = normalize(doc[field])
+                if value != doc[field]:
+                    changes[field] = value
+            if changes:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+        if operations:
+            await db[collection_name].bulk_write(operations, ordered=False)
+        updated[collection_name] = len(operations)
+    return updated
+
 # ==================== AUTH HELPERS ====================
 
 def hash_password(password: str) -> str:
@@ -628,17 +923,19 @@ async def login(user_login: UserLogin):
 async def register_visitor(visitor_data: VisitorCreate):
     """Public registration form for new visitors"""
     # Calculate assigned_month from visit_date
+    visitor_data.visit_date = canonical_day(visitor_data.visit_date)
     try:
         visit_dt = datetime.fromisoformat(visitor_data.visit_date)
         assigned_month = visit_dt.strftime("%Y-%m")
     except:
         assigned_month = datetime.now(timezone.utc).strftime("%Y-%m")
     
-    visitor = Visitor(**visitor_data.model_dump(), assigned_month=assigned_month)
+    visitor = Visitor(**visitor_data.model_dump(), assigned_month=assigned_month, **promo_fields(assigned_month))
     doc = visitor.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     
     await db.visitors.insert_one(doc)
+    await apply_promo_rollup(doc, 1)
     return {"message": "Registration successful", "id": visitor.id}
 
 # ==================== USER ROUTES ====================
@@ -709,6 +1006,7 @@ async def create_user(user_data: UserCreate, current_user: dict = Depends(get_cu
     doc['created_at'] = doc['created_at'].isoformat()
     
     await db.users.insert_one(doc)
+    invalidate_cache("bergeries_list")
     return {"message": "User created successfully", "id": user.id}
 
 @api_router.post("/users/referent")
@@ -753,6 +1051,7 @@ async def update_user(user_id: str, update_data: UserUpdate, current_user: dict
             raise HTTPException(status_code=404, detail="User not found")
         # Mettre à jour les champs autorisés
         await db.users.update_one({"id": user_id}, {"$set": update_dict})
+        invalidate_cache("bergeries_list")
         return {"message": "User updated successfully"}
     
     # Sinon, vérifier les permissions normales
@@ -808,6 +1107,7 @@ async def update_user(user_id: str, update_data: UserUpdate, current_user: dict
     
     if update_dict:
         await db.users.update_one({"id": user_id}, {"$set": update_dict})
+        invalidate_cache("bergeries_list")
     
     return {"message": "User updated successfully"}
 
@@ -821,6 +1121,7 @@ async def delete_user(user_id: str, current_user: dict = Depends(get_current_use
     # Super admin can delete anyone
     if is_super_admin(current_user):
         await db.users.delete_one({"id": user_id})
+        invalidate_cache("bergeries_list")
         return {"message": "User deleted successfully"}
     
     # Regular admin or promotions can only delete users from their city (but not other admins)
@@ -830,6 +1131,7 @@ async def delete_user(user_id: str, current_user: dict = Depends(get_current_use
         if user_to_delete["role"] in ["superviseur_promos", "promotions"]:
             raise HTTPException(status_code=403, detail="Cannot delete other admins")
         await db.users.delete_one({"id": user_id})
+        invalidate_cache("bergeries_list")
         return {"message": "User deleted successfully"}
     
     # Superviseur FI can delete pilote_fi and responsable_secteur from their city
@@ -839,6 +1141,7 @@ async def delete_user(user_id: str, current_user: dict = Depends(get_current_use
         if user_to_delete["role"] not in ["pilote_fi", "responsable_secteur"]:
             raise HTTPException(status_code=403, detail="Can only delete pilotes and responsables de secteur")
         await db.users.delete_one({"id": user_id})
+        invalidate_cache("bergeries_list")
         return {"message": "User deleted successfully"}
     
     # Responsable secteur can delete pilote_fi from their city (even if assigned to FI)
@@ -855,6 +1158,7 @@ async def delete_user(user_id: str, current_user: dict = Depends(get_current_use
         )
         
         await db.users.delete_one({"id": user_id})
+        invalidate_cache("bergeries_list")
         return {"message": "User deleted successfully"}
     
     raise HTTPException(status_code=403, detail="Only admin can delete users")
@@ -1035,34 +1339,38 @@ async def create_visitor(visitor_data: VisitorCreate, current_user: dict = Depen
     # Only superviseur_promos, responsable_promo, referent, super_admin, pasteur can create
     
     # Calculate assigned_month
+    visitor_data.visit_date = canonical_day(visitor_data.visit_date)
     try:
         visit_dt = datetime.fromisoformat(visitor_data.visit_date)
         assigned_month = visit_dt.strftime("%Y-%m")
     except:
         assigned_month = datetime.now(timezone.utc).strftime("%Y-%m")
     
-    visitor = Visitor(**visitor_data.model_dump(), assigned_month=assigned_month)
+    visitor = Visitor(**visitor_data.model_dump(), assigned_month=assigned_month, **promo_fields(assigned_month))
     doc = visitor.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     
     await db.visitors.insert_one(doc)
+    await apply_promo_rollup(doc, 1)
     return {"message": "Visitor created successfully", "id": visitor.id}
 
 @api_router.post("/visitors/public")
 async def create_visitor_public(visitor_data: VisitorCreate):
     """Créer un visiteur - Public (pour les bergeries)"""
     # Calculate assigned_month
+    visitor_data.visit_date = canonical_day(visitor_data.visit_date)
     try:
         visit_dt = datetime.fromisoformat(visitor_data.visit_date)
         assigned_month = visit_dt.strftime("%Y-%m")
     except:
         assigned_month = datetime.now(timezone.utc).strftime("%Y-%m")
     
-    visitor = Visitor(**visitor_data.model_dump(), assigned_month=assigned_month)
+    visitor = Visitor(**visitor_data.model_dump(), assigned_month=assigned_month, **promo_fields(assigned_month))
     doc = visitor.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     
     await db.visitors.insert_one(doc)
+    await apply_promo_rollup(doc, 1)
     return {"message": "Visitor created successfully", "id": visitor.id}
 
 # PUBLIC VISITOR ENDPOINTS - Pour les bergeries publiques
@@ -1081,21 +1389,28 @@ async def update_visitor_public(visitor_id: str, update_data: dict):
     protected = ['id', 'created_at', 'assigned_month']
     for field in protected:
         update_data.pop(field, None)
+    if "visit_date" in update_data:
+        update_data["visit_date"] = canonical_day(update_data["visit_date"])
     
+    before = await db.visitors.find_one({"id": visitor_id}, {"_id": 0})
     result = await db.visitors.update_one(
         {"id": visitor_id},
         {"$set": update_data}
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Visitor not found")
+    await refresh_promo_rollup(before, visitor_id)
     return {"message": "Visitor updated successfully"}
 
 @api_router.delete("/visitors/public/{visitor_id}")
 async def delete_visitor_public(visitor_id: str):
     """Supprimer un visiteur - Public"""
+    before = await db.visitors.find_one({"id": visitor_id}, {"_id": 0})
     result = await db.visitors.delete_one({"id": visitor_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Visitor not found")
+    await db.visitor_presences.delete_many({"visitor_id": visitor_id})
+    await apply_promo_rollup(before, -1)
     return {"message": "Visitor deleted successfully"}
 
 @api_router.post("/visitors/public/{visitor_id}/comment")
@@ -1130,6 +1445,7 @@ async def update_visitor_formation_public(visitor_id: str, formation_data: dict)
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Visitor not found")
+    invalidate_visitor_views()
     return {"message": "Formation updated successfully"}
 
 @api_router.post("/visitors/public/{visitor_id}/stop")
@@ -1137,6 +1453,7 @@ async def stop_visitor_tracking_public(visitor_id: str, stop_data: dict):
     """Arrêter le suivi d'un visiteur - Public"""
     reason = stop_data.get("reason", "")
     
+    before = await db.visitors.find_one({"id": visitor_id}, {"_id": 0})
     result = await db.visitors.update_one(
         {"id": visitor_id},
         {"$set": {
@@ -1147,6 +1464,7 @@ async def stop_visitor_tracking_public(visitor_id: str, stop_data: dict):
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Visitor not found")
+    await refresh_promo_rollup(before, visitor_id)
     return {"message": "Tracking stopped successfully"}
 
 @api_router.post("/visitors/bulk-ancien")
@@ -1159,6 +1477,7 @@ async def create_bulk_ancien_visitors(visitors_data: List[VisitorCreate], curren
     created_ids = []
     for visitor_data in visitors_data:
         # Calculate assigned_month
+        visitor_data.visit_date = canonical_day(visitor_data.visit_date)
         try:
             visit_dt = datetime.fromisoformat(visitor_data.visit_date)
             assigned_month = visit_dt.strftime("%Y-%m")
@@ -1169,20 +1488,18 @@ async def create_bulk_ancien_visitors(visitors_data: List[VisitorCreate], curren
         visitor_dict = visitor_data.model_dump()
         visitor_dict['is_ancien'] = True
         
-        visitor = Visitor(**visitor_dict, assigned_month=assigned_month)
+        visitor = Visitor(**visitor_dict, assigned_month=assigned_month, **promo_fields(assigned_month))
         doc = visitor.model_dump()
         doc['created_at'] = doc['created_at'].isoformat()
         
         await db.visitors.insert_one(doc)
+        await apply_promo_rollup(doc, 1)
         created_ids.append(visitor.id)
     
     return {"message": f"{len(created_ids)} anciens visiteurs créés avec succès", "ids": created_ids}
 
-@api_router.get("/visitors")
-async def get_visitors(
-    include_stopped: bool = False,
-    current_user: dict = Depends(get_current_user)
-):
+def visitor_scope_query(current_user: dict) -> dict:
+    """Périmètre ville / promo des visiteurs visibles par l'utilisateur"""
     # Super Admin and Pasteur can see all cities
     if current_user["role"] in ["super_admin", "pasteur"]:
         query = {}
@@ -1191,10 +1508,6 @@ async def get_visitors(
             "city": current_user["city"]
         }
     
-    # Include or exclude stopped visitors
-    if not include_stopped:
-        query["tracking_stopped"] = False
-    
     # Filter by role and permissions
     # Both referent and responsable_promo should see all visitors from their assigned month regardless of year
     if current_user["role"] in ["referent", "responsable_promo", "promotions"]:
@@ -1210,13 +1523,23 @@ async def get_visitors(
                     # Multiple months: use $in to match any of them
                     query["assigned_month"] = {"$in": months_list}
                 else:
-                    # Single month: Extract month part only (MM from YYYY-MM) to match all years
-                    month_part = user_assigned_month.split("-")[-1] if "-" in user_assigned_month else user_assigned_month
-                    # Use regex to match any year with this month
+                    # Single month: match all years on the indexed promo_month field
                     # Example: referent with assigned_month="2024-08" sees ALL august visitors (2024-08, 2025-08, etc.)
-                    query["assigned_month"] = {"$regex": f"-{month_part}$"}
+                    query["promo_month"] = promo_month_part(user_assigned_month)
     
     # superviseur_promos sees ALL visitors from their city (no month filter)
+    return query
+
+@api_router.get("/visitors")
+async def get_visitors(
+    include_stopped: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    query = visitor_scope_query(current_user)
+    
+    # Include or exclude stopped visitors
+    if not include_stopped:
+        query["tracking_stopped"] = False
     
     # Exclure les visiteurs supprimés (sauf pour super_admin qui peut les voir avec endpoint dédié)
     query["deleted"] = {"$ne": True}
@@ -1308,9 +1631,12 @@ async def update_visitor(visitor_id: str, update_data: VisitorUpdate, current_us
     
     # Update only provided fields
     update_dict = {k: v for k, v in update_data.model_dump().items() if v is not None}
+    if "assigned_month" in update_dict:
+        update_dict.update(promo_fields(update_dict["assigned_month"]))
     
     if update_dict:
         await db.visitors.update_one({"id": visitor_id}, {"$set": update_dict})
+        await refresh_promo_rollup(visitor, visitor_id)
     
     return {"message": "Visitor updated successfully"}
 
@@ -1399,16 +1725,14 @@ KPI_WEIGHTS = {
     "bapteme": 2
 }
 
-# Niveaux de discipolat
+# Niveaux de discipolat: (score maximum exclu, niveau)
+DISCIPOLAT_LEVELS = [(20, "Non classé"), (40, "Débutant"), (60, "Intermédiaire")]
+
 def get_discipolat_level(score: float) -> str:
-    if score < 20:
-        return "Non classé"
-    elif score < 40:
-        return "Débutant"
-    elif score < 60:
-        return "Intermédiaire"
-    else:
-        return "Confirmé"
+    for threshold, level in DISCIPOLAT_LEVELS:
+        if score < threshold:
+            return level
+    return "Confirmé"
 
 def calculate_kpi_score(kpi: dict) -> float:
     """Calcule le score KPI basé sur les coefficients"""
@@ -1417,6 +1741,88 @@ def calculate_kpi_score(kpi: dict) -> float:
         score += kpi.get(key, 0) * weight
     return score
 
+# ---------- Moyennes courantes ----------
+# Chaque visiteur / membre porte discipolat_sum et discipolat_count (somme et nombre
+# de ses scores mensuels), mis à jour à chaque enregistrement de KPI.
+# collection KPI -> (champ propriétaire, collection propriétaire)
+KPI_OWNERS = {
+    "kpi_discipolat": ("visitor_id", "visitors"),
+    "kpi_membres_bergerie": ("membre_id", "membres_disciples")
+}
+
+def discipolat_running_update(delta_sum: float, delta_count: int, extra: Optional[dict] = None) -> list:
+    """Pipeline d'update: incrémente somme / nombre puis recalcule score et niveau moyens"""
+    average = {"$divide": ["$discipolat_sum", {"$max": ["$discipolat_count", 1]}]}
+    level = {"$switch": {
+        "branches": [{"case": {"$lt": [average, threshold]}, "then": name} for threshold, name in DISCIPOLAT_LEVELS],
+        "default": "Confirmé"
+    }}
+    return [
+        {"$set": {
+            "discipolat_sum": {"$add": [{"$ifNull": ["$discipolat_sum", 0]}, delta_sum]},
+            "discipolat_count": {"$add": [{"$ifNull": ["$discipolat_count", 0]}, delta_count]}
+        }},
+        {"$set": {
+            "discipolat_score": {"$round": [average, 1]},
+            "discipolat_level": level,
+            **(extra or {})
+        }}
+    ]
+
+async def save_monthly_kpi(kpi_collection: str, owner_id: str, kpi_data: dict, extra: Optional[dict] = None):
+    """Upsert du KPI mensuel et mise à jour O(1) de la moyenne du propriétaire"""
+    owner_field, owner_collection = KPI_OWNERS[kpi_collection]
+    previous = await db[kpi_collection].find_one_and_update(
+        {owner_field: owner_id, "mois": kpi_data["mois"]},
+        {"$set": kpi_data},
+        projection={"_id": 0, "score": 1},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+    # Écrasement d'un mois existant: on retire l'ancien score
+    delta_sum = kpi_data["score"] - ((previous or {}).get("score") or 0)
+    delta_count = 0 if previous else 1
+    await db[owner_collection].update_one(
+        {"id": owner_id},
+        discipolat_running_update(delta_sum, delta_count, extra)
+    )
+
+KPI_WEIGHTS_VERSION = ",".join(f"{key}={weight}" for key, weight in sorted(KPI_WEIGHTS.items()))
+
+@data_migration(f"kpi_scores[{KPI_WEIGHTS_VERSION}]")
+async def recompute_discipolat_scores():
+    """Recalcule scores mensuels et moyennes courantes (à chaque changement de KPI_WEIGHTS)"""
+    updated = {}
+    for kpi_collection, (owner_field, owner_collection) in KPI_OWNERS.items():
+        operations = []
+        projection = {"_id": 1, "score": 1, **{key: 1 for key in KPI_WEIGHTS}}
+        async for kpi in db[kpi_collection].find({}, projection):
+            score = calculate_kpi_score(kpi)
+            if score != kpi.get("score"):
+                operations.append(UpdateOne(
+                    {"_id": kpi["_id"]},
+                    {"$set": {"score": score, "level": get_discipolat_level(score)}}
+                ))
+        if operations:
+            await db[kpi_collection].bulk_write(operations, ordered=False)
+        
+        totals = await db[kpi_collection].aggregate([
+            {"$group": {"_id": f"${owner_field}", "sum": {"$sum": "$score"}, "count": {"$sum": 1}}}
+        ]).to_list(length=None)
+        owner_operations = [
+            UpdateOne({"id": t["_id"]}, {"$set": {
+                "discipolat_sum": t["sum"],
+                "discipolat_count": t["count"],
+                "discipolat_score": round(t["sum"] / t["count"], 1),
+                "discipolat_level": get_discipolat_level(t["sum"] / t["count"])
+            }})
+            for t in totals if t["_id"]
+        ]
+        if owner_operations:
+            await db[owner_collection].bulk_write(owner_operations, ordered=False)
+        updated[kpi_collection] = {"scores": len(operations), "owners": len(owner_operations)}
+    return updated
+
 @api_router.post("/visitors/{visitor_id}/kpi")
 async def save_kpi_discipolat(visitor_id: str, kpi: KPIDiscipolatEntry):
     """Enregistrer les KPIs Discipolat pour un visiteur pour un mois donné (PUBLIC)"""
@@ -1445,29 +1851,12 @@ async def save_kpi_discipolat(visitor_id: str, kpi: KPIDiscipolatEntry):
         "updated_by": "public"
     }
     
-    # Upsert: mettre à jour ou créer
-    await db.kpi_discipolat.update_one(
-        {"visitor_id": visitor_id, "mois": kpi.mois},
-        {"$set": kpi_data},
-        upsert=True
+    # Upsert du mois et mise à jour du statut moyen du visiteur
+    await save_monthly_kpi(
+        "kpi_discipolat", visitor_id, kpi_data,
+        {"discipolat_updated_at": datetime.now(timezone.utc).isoformat()}
     )
     
-    # Recalculer le statut moyen du visiteur
-    all_kpis = await db.kpi_discipolat.find({"visitor_id": visitor_id}, {"_id": 0}).to_list(100)
-    if all_kpis:
-        avg_score = sum(k.get("score", 0) for k in all_kpis) / len(all_kpis)
-        avg_level = get_discipolat_level(avg_score)
-        
-        # Mettre à jour le statut du visiteur
-        await db.visitors.update_one(
-            {"id": visitor_id},
-            {"$set": {
-                "discipolat_score": round(avg_score, 1),
-                "discipolat_level": avg_level,
-                "discipolat_updated_at": datetime.now(timezone.utc).isoformat()
-            }}
-        )
-    
     return {
         "message": "KPI saved successfully",
         "score": score,
@@ -1526,44 +1915,34 @@ async def get_visitor_kpi_for_month(visitor_id: str, mois: str, current_user: di
 @api_router.get("/visitors/kpi/all-statuses")
 async def get_all_visitors_kpi_statuses(current_user: dict = Depends(get_current_user)):
     """Récupérer les statuts KPI moyens de tous les visiteurs de la ville"""
-    # Récupérer tous les KPIs
-    all_kpis = await db.kpi_discipolat.find({}).to_list(10000)
-    
-    # Récupérer tous les visiteurs pour les statuts manuels
-    all_visitors = await db.visitors.find({}, {"id": 1, "manual_discipolat_status": 1, "manual_discipolat_commentaire": 1}).to_list(10000)
-    manual_statuses = {v["id"]: v for v in all_visitors if v.get("manual_discipolat_status")}
-    
-    # Grouper par visitor_id et calculer la moyenne
-    visitor_kpis = {}
-    for kpi in all_kpis:
-        vid = kpi.get("visitor_id")
-        if vid not in visitor_kpis:
-            visitor_kpis[vid] = []
-        visitor_kpis[vid].append(kpi.get("score", 0))
-    
-    # Calculer moyenne et niveau pour chaque visiteur
+    query = visitor_scope_query(current_user)
+    query["deleted"] = {"$ne": True}
+    # Moyennes courantes portées par le visiteur (cf. save_monthly_kpi)
+    visitors = await db.visitors.find(
+        query,
+        {"_id": 0, "id": 1, "discipolat_sum": 1, "discipolat_count": 1,
+         "manual_discipolat_status": 1, "manual_discipolat_commentaire": 1}
+    ).to_list(length=None)
+    
     result = {}
-    for vid, scores in visitor_kpis.items():
-        if scores:
-            avg = round(sum(scores) / len(scores), 1)
-            level = get_discipolat_level(avg)
-            result[vid] = {"average_score": avg, "level": level, "months_count": len(scores)}
-            
-            # Ajouter statut manuel si présent
-            if vid in manual_statuses:
-                result[vid]["manual_status"] = manual_statuses[vid].get("manual_discipolat_status")
-                result[vid]["manual_commentaire"] = manual_statuses[vid].get("manual_discipolat_commentaire", "")
-    
-    # Ajouter les visiteurs avec statut manuel mais sans KPIs
-    for vid, v in manual_statuses.items():
-        if vid not in result:
-            result[vid] = {
-                "average_score": 0,
-                "level": "Non classé",
-                "months_count": 0,
-                "manual_status": v.get("manual_discipolat_status"),
-                "manual_commentaire": v.get("manual_discipolat_commentaire", "")
-            }
+    for visitor in visitors:
+        vid = visitor["id"]
+        months_count = visitor.get("discipolat_count") or 0
+        manual_status = visitor.get("manual_discipolat_status")
+        if not months_count and not manual_status:
+            continue
+        
+        avg = round(visitor.get("discipolat_sum", 0) / months_count, 1) if months_count else 0
+        result[vid] = {
+            "average_score": avg,
+            "level": get_discipolat_level(avg),
+            "months_count": months_count
+        }
+        
+        # Ajouter statut manuel si présent
+        if manual_status:
+            result[vid]["manual_status"] = manual_status
+            result[vid]["manual_commentaire"] = visitor.get("manual_discipolat_commentaire", "")
     
     return result
 
@@ -1593,9 +1972,202 @@ async def update_manual_status(visitor_id: str, data: ManualStatusUpdate, curren
     return {"message": "Manual status updated successfully"}
 
 
+# Collection promo_rollups : compteurs pré-agrégés de /analytics/promotions-detailed.
+# - ligne promo (presence_month = None) : effectifs, types, canaux, arrivées par jour, suivis arrêtés
+# - ligne mensuelle (presence_month = "YYYY-MM") : présences des visiteurs actifs
+# Chaque écriture sur un visiteur retire son ancienne contribution et ajoute la nouvelle.
+PROMO_CHANNELS = [
+    "Evangelisation",
+    "Réseaux sociaux",
+    "Invitation par un membre (hors evangelisation)",
+    "Par soi même"
+]
+
+def promo_rollup_increments(visitor: dict) -> tuple:
+    """Contribution d'un visiteur : ($inc de la ligne promo, {presence_month: $inc})"""
+    types = visitor.get("types") or []
+    stopped = bool(visitor.get("tracking_stopped"))
+    inc = {
+        "total_all": 1,
+        "active": 0 if stopped else 1,
+        "stopped": 1 if stopped else 0,
+        "nc": int("Nouveau Converti" in types),
+        "dp": int("De Passage" in types),
+        "residents": int("De Passage" not in types)
+    }
+    channel = visitor.get("arrival_channel")
+    if channel in PROMO_CHANNELS:
+        inc[f"canal.{channel}"] = 1
+    
+    visit_date = visitor.get("visit_date")
+    if isinstance(visit_date, str) and visit_date and "." not in visit_date and not visit_date.startswith("$"):
+        inc[f"daily.{visit_date}.total"] = 1
+        inc[f"daily.{visit_date}.dp"] = int("De Passage" in types)
+        inc[f"daily.{visit_date}.residents"] = int("De Passage" not in types)
+        inc[f"daily.{visit_date}.na"] = int("Nouveau Arrivant" in types)
+        inc[f"daily.{visit_date}.nc"] = int("Nouveau Converti" in types)
+    
+    # Présences comptées seulement pour les visiteurs actifs
+    monthly = {}
+    if not stopped:
+        for presence_type, field in PRESENCE_FIELDS.items():
+            for p in visitor.get(field) or []:
+                if p.get("present"):
+                    month = (p.get("date") or "")[:7]
+                    counts = monthly.setdefault(month, {"present_dimanche": 0, "present_jeudi": 0})
+                    counts[f"present_{presence_type}"] += 1
+    return inc, monthly
+
+async def apply_promo_rollup(visitor: Optional[dict], sign: int):
+    """Ajoute (sign=1) ou retire (sign=-1) la contribution d'un visiteur aux rollups"""
+    if not visitor:
+        return
+    key = {"city": visitor.get("city"), "assigned_month": visitor.get("assigned_month")}
+    inc, monthly = promo_rollup_increments(visitor)
+    
+    promo_update = {"$inc": {k: sign * v for k, v in inc.items()}}
+    if visitor.get("tracking_stopped"):
+        if sign > 0:
+            promo_update["$push"] = {"suivis_arretes": {
+                "visitor_id": visitor.get("id"),
+                "name": f"{visitor.get('firstname', '')} {visitor.get('lastname', '')}",
+                "reason": visitor.get("stop_reason", "Non spécifié")
+            }}
+        else:
+            promo_update["$pull"] = {"suivis_arretes": {"visitor_id": visitor.get("id")}}
+    
+    operations = [UpdateOne({**key, "presence_month": None}, promo_update, upsert=True)]
+    for month, counts in monthly.items():
+        operations.append(UpdateOne(
+            {**key, "presence_month": month},
+            {"$inc": {k: sign * v for k, v in counts.items()}},
+            upsert=True
+        ))
+    await db.promo_rollups.bulk_write(operations, ordered=False)
+    invalidate_visitor_views(key["city"])
+
+def invalidate_visitor_views(city: Optional[str] = None):
+    """Invalide les vues mises en cache dérivées des visiteurs d'une ville (toutes si None)"""
+    if city is None:
+        invalidate_cache("bergeries_list")
+        invalidate_cache("bergerie_reproduction")
+        return
+    invalidate_cache("bergeries_list", lambda key: key == city)
+    invalidate_cache("bergerie_reproduction", lambda key: key[0] == city)
+
+async def refresh_promo_rollup(before: Optional[dict], visitor_id: str):
+    """Remplace la contribution d'un visiteur (état avant écriture) par son état actuel"""
+    after = await db.visitors.find_one({"id": visitor_id}, {"_id": 0})
+    await apply_promo_rollup(before, -1)
+    await apply_promo_rollup(after, 1)
+
+async def rebuild_promo_rollups(city: Optional[str] = None) -> int:
+    """Recalcule entièrement promo_rollups depuis les visiteurs (backfill / réparation)"""
+    query = {"city": city} if city else {}
+    rows = {}
+    async for visitor in db.visitors.find(query, {"_id": 0, "comments": 0}):
+        key = (visitor.get("city"), visitor.get("assigned_month"))
+        inc, monthly = promo_rollup_increments(visitor)
+        
+        row = rows.setdefault(key + (None,), {"suivis_arretes": []})
+        for path, value in inc.items():
+            target = row
+            *parents, leaf = path.split(".")
+            for part in parents:
+                target = target.setdefault(part, {})
+            target[leaf] = target.get(leaf, 0) + value
+        if visitor.get("tracking_stopped"):
+            row["suivis_arretes"].append({
+                "visitor_id": visitor.get("id"),
+                "name": f"{visitor.get('firstname', '')} {visitor.get('lastname', '')}",
+                "reason": visitor.get("stop_reason", "Non spécifié")
+            })
+        
+        for month, counts in monthly.items():
+            month_row = rows.setdefault(key + (month,), {"present_dimanche": 0, "present_jeudi": 0})
+            for field, value in counts.items():
+                month_row[field] += value
+    
+    await db.promo_rollups.delete_many(query)
+    docs = [
+        {"city": row_city, "assigned_month": assigned_month, "presence_month": presence_month, **values}
+        for (row_city, assigned_month, presence_month), values in rows.items()
+    ]
+    if docs:
+        await db.promo_rollups.insert_many(docs)
+    invalidate_visitor_views(city)
+    return len(docs)
+
+@data_migration("promo_rollups_backfill")
+async def migrate_promo_rollups():
+    """Construit promo_rollups pour les visiteurs existants"""
+    return {"rows": await rebuild_promo_rollups()}
+
+# Collection normalisée visitor_presences : une ligne par (visitor_id, date, type).
+# Les tableaux embarqués du visiteur restent alimentés pour les vues existantes.
+PRESENCE_FIELDS = {"dimanche": "presences_dimanche", "jeudi": "presences_jeudi"}
+
+def visitor_presence_docs(visitor: dict) -> List[dict]:
+    """Lignes visitor_presences d'un visiteur, construites depuis ses tableaux embarqués"""
+    docs = {}
+    for presence_type, field in PRESENCE_FIELDS.items():
+        for p in visitor.get(field) or []:
+            if not p.get("date"):
+                continue
+            docs.setdefault((p["date"], presence_type), {
+                "visitor_id": visitor["id"],
+                "date": p["date"],
+                "type": presence_type,
+                "present": p.get("present"),
+                "commentaire": p.get("commentaire")
+            })
+    return list(docs.values())
+
+async def sync_visitor_presences(visitors: List[dict]) -> int:
+    """Reconstruit les lignes visitor_presences des visiteurs donnés"""
+    visitor_ids = [v["id"] for v in visitors if v.get("id")]
+    if not visitor_ids:
+        return 0
+    docs = [doc for v in visitors if v.get("id") for doc in visitor_presence_docs(v)]
+    await db.visitor_presences.delete_many({"visitor_id": {"$in": visitor_ids}})
+    if docs:
+        await db.visitor_presences.insert_many(docs)
+    return len(docs)
+
+@data_migration("visitor_presences_from_embedded_arrays")
+async def migrate_visitor_presences():
+    """Copie les présences embarquées des visiteurs dans visitor_presences"""
+    projection = {"_id": 0, "id": 1, "presences_dimanche": 1, "presences_jeudi": 1}
+    cursor = db.visitors.find({}, projection)
+    batch = []
+    total = 0
+    async for visitor in cursor:
+        batch.append(visitor)
+        if len(batch) >= 500:
+            total += await sync_visitor_presences(batch)
+            batch = []
+    total += await sync_visitor_presences(batch)
+    return {"presences": total}
+
+@data_migration("visitors_promo_fields")
+async def migrate_visitors_promo_fields():
+    """Renseigne promo_year / promo_month pour chaque assigned_month distinct"""
+    months = await db.visitors.distinct("assigned_month")
+    updated = 0
+    for assigned_month in months:
+        result = await db.visitors.update_many(
+            {"assigned_month": assigned_month},
+            {"$set": promo_fields(assigned_month)}
+        )
+        updated += result.modified_count
+    return {"visitors": updated}
+
 @api_router.post("/visitors/{visitor_id}/presence")
 async def add_presence(visitor_id: str, presence: PresenceAdd, current_user: dict = Depends(get_current_user)):
-    visitor = await db.visitors.find_one({"id": visitor_id, "city": current_user["city"]})
+    visitor = await db.visitors.find_one(
+        {"id": visitor_id, "city": current_user["city"]},
+        {"_id": 0, "id": 1, "city": 1, "assigned_month": 1, "tracking_stopped": 1}
+    )
     
     if not visitor:
         raise HTTPException(status_code=404, detail="Visitor not found")
@@ -1612,53 +2184,91 @@ async def add_presence(visitor_id: str, presence: PresenceAdd, current_user: dic
         commentaire=presence.commentaire
     )
     
-    field = "presences_dimanche" if presence.type == "dimanche" else "presences_jeudi"
+    presence_type = "dimanche" if presence.type == "dimanche" else "jeudi"
+    field = PRESENCE_FIELDS[presence_type]
     
-    # Check if date already exists, update or add
-    existing_presences = visitor.get(field, [])
-    date_exists = False
-    
-    for i, p in enumerate(existing_presences):
-        if p["date"] == presence.date:
-            existing_presences[i] = presence_entry.model_dump()
-            date_exists = True
-            break
+    previous = await db.visitor_presences.find_one(
+        {"visitor_id": visitor_id, "date": presence.date, "type": presence_type},
+        {"_id": 0, "present": 1}
+    )
     
-    if not date_exists:
+    # Mise à jour positionnelle si la date existe déjà, sinon ajout
+    result = await db.visitors.update_one(
+        {"id": visitor_id, f"{field}.date": presence.date},
+        {"$set": {f"{field}.$": presence_entry.model_dump()}}
+    )
+    if result.matched_count == 0:
         await db.visitors.update_one(
             {"id": visitor_id},
             {"$push": {field: presence_entry.model_dump()}}
         )
-    else:
-        await db.visitors.update_one(
-            {"id": visitor_id},
-            {"$set": {field: existing_presences}}
+    
+    await db.visitor_presences.update_one(
+        {"visitor_id": visitor_id, "date": presence.date, "type": presence_type},
+        {"$set": {"present": presence.present, "commentaire": presence.commentaire}},
+        upsert=True
+    )
+    
+    # Rollup mensuel : seul le passage présent <-> non présent change les compteurs
+    delta = int(bool(presence.present)) - int(bool(previous and previous.get("present")))
+    if delta and not visitor.get("tracking_stopped"):
+        await db.promo_rollups.update_one(
+            {
+                "city": visitor.get("city"),
+                "assigned_month": visitor.get("assigned_month"),
+                "presence_month": presence.date[:7]
+            },
+            {"$inc": {f"present_{presence_type}": delta}},
+            upsert=True
         )
+    invalidate_visitor_views(visitor.get("city"))
     
     return {"message": "Presence updated successfully"}
 
+@api_router.get("/visitors/{visitor_id}/presences")
+async def get_visitor_presences(visitor_id: str, type: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    """Historique des présences d'un visiteur"""
+    visitor_query = {"id": visitor_id}
+    if current_user["role"] not in ["admin", "super_admin", "pasteur"]:
+        visitor_query["city"] = current_user["city"]
+    
+    if not await db.visitors.find_one(visitor_query, {"_id": 0, "id": 1}):
+        raise HTTPException(status_code=404, detail="Visitor not found")
+    
+    query = {"visitor_id": visitor_id}
+    if type:
+        query["type"] = type
+    
+    return await db.visitor_presences.find(query, {"_id": 0}).sort("date", 1).to_list(length=None)
+
 @api_router.get("/presences/by-date")
 async def get_presences_by_date(date: str, current_user: dict = Depends(get_current_user)):
     """Get all presences for a specific date"""
     # Filter visitors by city if not admin/super_admin
     city_filter = {} if current_user["role"] in ["admin", "super_admin", "pasteur"] else {"city": current_user["city"]}
     
-    visitors = await db.visitors.find(city_filter).to_list(length=None)
+    presences = await db.visitor_presences.find({"date": date}, {"_id": 0}).to_list(length=None)
+    
+    # Une seule présence par visiteur (dimanche prioritaire sur jeudi)
+    presence_by_visitor = {}
+    for p in sorted(presences, key=lambda p: p["type"] != "dimanche"):
+        presence_by_visitor.setdefault(p["visitor_id"], p)
+    
+    visitors = await db.visitors.find(
+        {"id": {"$in": list(presence_by_visitor)}, **city_filter},
+        {"_id": 0, "id": 1, "firstname": 1, "lastname": 1}
+    ).to_list(length=None)
     
     result = []
     for visitor in visitors:
-        # Check both dimanche and jeudi presences
-        all_presences = visitor.get("presences_dimanche", []) + visitor.get("presences_jeudi", [])
-        presence_for_date = next((p for p in all_presences if p.get("date") == date), None)
-        
-        if presence_for_date:
-            result.append({
-                "visitor_id": visitor["id"],
-                "firstname": visitor["firstname"],
-                "lastname": visitor["lastname"],
-                "present": presence_for_date.get("present"),
-                "commentaire": presence_for_date.get("commentaire")
-            })
+        presence_for_date = presence_by_visitor[visitor["id"]]
+        result.append({
+            "visitor_id": visitor["id"],
+            "firstname": visitor["firstname"],
+            "lastname": visitor["lastname"],
+            "present": presence_for_date.get("present"),
+            "commentaire": presence_for_date.get("commentaire")
+        })
     
     return result
 
@@ -1683,6 +2293,7 @@ async def update_formation(visitor_id: str, formation: FormationUpdate, current_
         {"id": visitor_id},
         {"$set": {field: formation.completed}}
     )
+    invalidate_visitor_views(visitor.get("city"))
     
     return {"message": "Formation updated successfully"}
 
@@ -1708,6 +2319,7 @@ async def stop_tracking(visitor_id: str, stop_data: StopTracking, current_user:
             "stopped_date": datetime.now(timezone.utc).isoformat()
         }}
     )
+    await refresh_promo_rollup(visitor, visitor_id)
     
     return {"message": "Tracking stopped successfully"}
 
@@ -1832,6 +2444,8 @@ async def update_city(city_id: str, city_data: CityCreate, current_user: dict =
         {"city": old_name},
         {"$set": {"city": city_data.name}}
     )
+    await db.promo_rollups.delete_many({"city": old_name})
+    await rebuild_promo_rollups(city_data.name)
     
     return {"message": "City updated successfully"}
 
@@ -1880,9 +2494,9 @@ async def get_city_stats(
     if year and month:
         query["assigned_month"] = f"{year}-{month:02d}"
     elif year:
-        query["assigned_month"] = {"$regex": f"^{year}-"}
+        query["promo_year"] = year
     elif month:
-        query["assigned_month"] = {"$regex": f"-{month:02d}$"}
+        query["promo_month"] = f"{month:02d}"
     
     # PROMOTIONS STATS
     visitors = await db.visitors.find(query).to_list(10000)
@@ -1915,32 +2529,34 @@ async def get_city_stats(
     
     # Calculate FI fidelisation from presences_fi collection
     presences_query = {"fi_id": {"$in": fi_ids}} if fi_ids else {"fi_id": None}
-    if year and month:
-        presences_query["date"] = {"$regex": f"^{year}-{month:02d}"}
-    elif year:
-        presences_query["date"] = {"$regex": f"^{year}"}
-    
-    presences = await db.presences_fi.find(presences_query, {"_id": 0}).to_list(100000)
+    if year:
+        presences_query["date"] = period_range(year, month)
+    
+    presences_by_membre = await db.presences_fi.aggregate([
+        {"$match": presences_query},
+        {"$group": {
+            "_id": "$membre_fi_id",
+            "total": {"$sum": 1},
+            "present": {"$sum": {"$cond": ["$present", 1, 0]}}
+        }}
+    ]).to_list(length=None)
+    presences_by_membre = {g["_id"]: g for g in presences_by_membre}
     
     # Calculate fidelisation per member
     fi_fidelisation = 0
     fi_count = 0
     for membre in membres:
-        membre_presences = [p for p in presences if p.get("membre_fi_id") == membre["id"]]
+        membre_presences = presences_by_membre.get(membre["id"])
         if membre_presences:
-            present_count = sum(1 for p in membre_presences if p.get("present"))
-            if len(membre_presences) > 0:
-                fi_fidelisation += (present_count / len(membre_presences)) * 100
-                fi_count += 1
+            fi_fidelisation += (membre_presences["present"] / membre_presences["total"]) * 100
+            fi_count += 1
     
     avg_fidelisation_fi = (fi_fidelisation / fi_count) if fi_count > 0 else 0
     
     # CULTE STATS
     culte_query = {"ville": city_name}
-    if year and month:
-        culte_query["date"] = {"$regex": f"^{year}-{month:02d}"}
-    elif year:
-        culte_query["date"] = {"$regex": f"^{year}"}
+    if year:
+        culte_query["date"] = period_range(year, month)
     
     culte_stats = await db.culte_stats.find(culte_query).to_list(10000)
     
@@ -1982,44 +2598,8 @@ async def get_city_stats(
 
 async def get_evangelisation_stats_for_city(city_name: str, year: Optional[int], month: Optional[int]):
     """Helper to get evangelisation stats for a city"""
-    query = {"ville": city_name}
-    
-    if year and month:
-        query["date"] = {"$regex": f"^{year}-{month:02d}"}
-    elif year:
-        query["date"] = {"$regex": f"^{year}"}
-    
-    records = await db.evangelisation.find(query).to_list(1000)
-    
-    stats = {
-        "eglise": {
-            "nombre_gagneurs_ame": 0,
-            "nombre_personnes_receptives": 0,
-            "nombre_priere_salut": 0,
-            "nombre_contacts_pris": 0,
-            "nombre_ames_invitees": 0,
-            "nombre_miracles": 0
-        },
-        "familles_impact": {
-            "nombre_gagneurs_ame": 0,
-            "nombre_personnes_receptives": 0,
-            "nombre_priere_salut": 0,
-            "nombre_contacts_pris": 0,
-            "nombre_ames_invitees": 0,
-            "nombre_miracles": 0
-        }
-    }
-    
-    for record in records:
-        if record.get("eglise"):
-            for key in stats["eglise"]:
-                stats["eglise"][key] += record["eglise"].get(key, 0)
-        
-        if record.get("familles_impact"):
-            for key in stats["familles_impact"]:
-                stats["familles_impact"][key] += record["familles_impact"].get(key, 0)
-    
-    return stats
+    totals = await evangelisation_totals(city_name, year, month)
+    return {"eglise": totals["eglise"], "familles_impact": totals["familles_impact"]}
 
 # ==================== ANALYTICS ROUTES ====================
 
@@ -2055,21 +2635,24 @@ async def get_stats(
             if assigned_month:
                 # Handle both string and list formats
                 if isinstance(assigned_month, list):
-                    # Multiple months assigned - match any of them
-                    month_parts = []
-                    for month in assigned_month:
-                        month_part = month.split("-")[-1] if "-" in month else month
-                        month_parts.append(f"-{month_part}$")
-                    # Match any of the assigned months
-                    base_query["assigned_month"] = {"$regex": "|".join(month_parts)}
+                    # Multiple months assigned - match any of them (all years)
+                    base_query["promo_month"] = {"$in": [promo_month_part(month) for month in assigned_month]}
                 else:
-                    # Single month assigned
-                    month_part = assigned_month.split("-")[-1] if "-" in assigned_month else assigned_month
-                    # Use regex to match any year with this month
-                    base_query["assigned_month"] = {"$regex": f"-{month_part}$"}
-    
-    # Total visitors
-    total_visitors = await db.visitors.count_documents(base_query)
+                    # Single month assigned - match any year with this month
+                    base_query["promo_month"] = promo_month_part(assigned_month)
+    
+    # Mémoïsation courte par périmètre (rôle, ville, promo)
+    assigned_month = target_user.get("assigned_month")
+    cache_key = (
+        target_user["role"],
+        city,
+        tuple(assigned_month) if isinstance(assigned_month, list) else assigned_month,
+        bool((target_user.get("permissions") or {}).get("can_view_all_months", False))
+    )
+    cache = response_cache("analytics_stats", ttl=30, maxsize=512)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
     
     # Total referents (only for admin/promotions/pasteur/super_admin)
     if target_user["role"] in ["superviseur_promos", "promotions", "pasteur", "super_admin"]:
@@ -2080,44 +2663,43 @@ async def get_stats(
     else:
         total_referents = 0
     
-    # By arrival channel
-    pipeline = [
-        {"$match": base_query},
-        {"$group": {"_id": "$arrival_channel", "count": {"$sum": 1}}}
-    ]
-    by_channel = await db.visitors.aggregate(pipeline).to_list(1000)
-    
-    # By month
-    pipeline = [
-        {"$match": base_query},
-        {"$group": {"_id": "$assigned_month", "count": {"$sum": 1}}},
-        {"$sort": {"_id": 1}}
-    ]
-    by_month = await db.visitors.aggregate(pipeline).to_list(1000)
-    
-    # By type
+    # Total, by arrival channel, by month, by type and formations in one pass
     pipeline = [
         {"$match": base_query},
-        {"$unwind": "$types"},
-        {"$group": {"_id": "$types", "count": {"$sum": 1}}}
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "by_channel": [{"$group": {"_id": "$arrival_channel", "count": {"$sum": 1}}}],
+            "by_month": [
+                {"$group": {"_id": "$assigned_month", "count": {"$sum": 1}}},
+                {"$sort": {"_id": 1}}
+            ],
+            "by_type": [
+                {"$unwind": "$types"},
+                {"$group": {"_id": "$types", "count": {"$sum": 1}}}
+            ],
+            "formations": [{"$group": {
+                "_id": None,
+                "formation_pcnc": {"$sum": {"$cond": [{"$eq": ["$formation_pcnc", True]}, 1, 0]}},
+                "formation_au_coeur_bible": {"$sum": {"$cond": [{"$eq": ["$formation_au_coeur_bible", True]}, 1, 0]}},
+                "formation_star": {"$sum": {"$cond": [{"$eq": ["$formation_star", True]}, 1, 0]}}
+            }}]
+        }}
     ]
-    by_type = await db.visitors.aggregate(pipeline).to_list(1000)
+    facets = (await db.visitors.aggregate(pipeline).to_list(1))[0]
+    formations = facets["formations"][0] if facets["formations"] else {}
     
-    # Formations stats
-    formation_pcnc_count = await db.visitors.count_documents({**base_query, "formation_pcnc": True})
-    formation_au_coeur_bible_count = await db.visitors.count_documents({**base_query, "formation_au_coeur_bible": True})
-    formation_star_count = await db.visitors.count_documents({**base_query, "formation_star": True})
-    
-    return {
-        "total_visitors": total_visitors,
+    result = {
+        "total_visitors": facets["total"][0]["count"] if facets["total"] else 0,
         "total_referents": total_referents,
-        "by_channel": by_channel,
-        "by_month": by_month,
-        "by_type": by_type,
-        "formation_pcnc": formation_pcnc_count,
-        "formation_au_coeur_bible": formation_au_coeur_bible_count,
-        "formation_star": formation_star_count
+        "by_channel": facets["by_channel"],
+        "by_month": facets["by_month"],
+        "by_type": facets["by_type"],
+        "formation_pcnc": formations.get("formation_pcnc", 0),
+        "formation_au_coeur_bible": formations.get("formation_au_coeur_bible", 0),
+        "formation_star": formations.get("formation_star", 0)
     }
+    cache[cache_key] = result
+    return result
 
 @api_router.get("/analytics/export")
 async def export_excel(current_user: dict = Depends(get_current_user)):
@@ -2183,6 +2765,73 @@ def get_weeks_in_month(year, month):
         current += timedelta(days=1)
     return sorted(list(weeks))
 
+def count_weekly_presences(visitors: List[dict], start: Optional[str] = None, end: Optional[str] = None) -> Dict[int, Dict[str, int]]:
+    """Compte en une seule passe les présences (present=True) par semaine ISO et par type.
+    
+    Chaque date distincte n'est analysée qu'une fois. start/end ("YYYY-MM-DD", end exclu)
+    restreignent optionnellement la période.
+    """
+    week_of_date = {}
+    counts = {}
+    for visitor in visitors:
+        for presence_type, field in PRESENCE_FIELDS.items():
+            for presence in visitor.get(field) or []:
+                date_str = presence.get("date")
+                if not presence.get("present") or not isinstance(date_str, str):
+                    continue
+                if (start and date_str < start) or (end and date_str >= end):
+                    continue
+                if date_str not in week_of_date:
+                    week_of_date[date_str] = get_week_number(date_str)
+                week = week_of_date[date_str]
+                if week is None:
+                    continue
+                counts.setdefault(week, {"dimanche": 0, "jeudi": 0})[presence_type] += 1
+    return counts
+
+def weighted_weekly_rates(week_counts: Dict[int, Dict[str, int]], weeks, total_visitors: int) -> List[dict]:
+    """Taux hebdomadaires pondérés (dimanche x2, jeudi x1) pour les semaines demandées"""
+    expected_dimanche = total_visitors * 1  # 1 dimanche par semaine
+    expected_jeudi = total_visitors * 1  # 1 jeudi par semaine
+    max_weighted = (expected_dimanche * 2) + (expected_jeudi * 1)
+    
+    weekly_rates = []
+    for week in weeks:
+        counts = week_counts.get(week, {"dimanche": 0, "jeudi": 0})
+        actual_weighted = (counts["dimanche"] * 2) + (counts["jeudi"] * 1)
+        rate = (actual_weighted / max_weighted * 100) if max_weighted > 0 else 0
+        weekly_rates.append({
+            "week": week,
+            "rate": round(rate, 2),
+            "presences": counts["dimanche"] + counts["jeudi"],
+            "expected": expected_dimanche + expected_jeudi
+        })
+    return weekly_rates
+
+def presence_items_expr(field: str, presence_type: str) -> dict:
+    """Expression d'agrégation: tableau de présences embarqué annoté de son type"""
+    return {"$map": {
+        "input": {"$ifNull": [f"${field}", []]},
+        "as": "p",
+        "in": {"date": "$$p.date", "present": "$$p.present", "type": presence_type}
+    }}
+
+def present_count_expr(field: str, start: Optional[str] = None, end: Optional[str] = None) -> dict:
+    """Expression d'agrégation: nombre d'entrées present=True d'un tableau embarqué (période optionnelle)"""
+    conditions = [{"$eq": ["$$p.present", True]}]
+    if start and end:
+        conditions.append({"$gte": ["$$p.date", start]})
+        conditions.append({"$lt": ["$$p.date", end]})
+    return {"$size": {"$filter": {
+        "input": {"$ifNull": [f"${field}", []]},
+        "as": "p",
+        "cond": {"$and": conditions}
+    }}}
+
+def average_rate(weekly_rates: List[dict]) -> float:
+    """Moyenne des taux hebdomadaires"""
+    return sum(w["rate"] for w in weekly_rates) / len(weekly_rates) if weekly_rates else 0
+
 @api_router.get("/fidelisation/referent")
 async def get_referent_fidelisation(current_user: dict = Depends(get_current_user)):
     """Get fidelisation rate for referent, responsable_promo, superviseur_promos, and promotions roles"""
@@ -2208,8 +2857,8 @@ async def get_referent_fidelisation(current_user: dict = Depends(get_current_use
         else:
             query["assigned_month"] = assigned_month
     
-    all_visitors = await db.visitors.find(query, {"_id": 0}).to_list(10000)
-
+    projection = {"_id": 0, "types": 1, "tracking_stopped": 1, "presences_dimanche": 1, "presences_jeudi": 1}
+    all_visitors = await db.visitors.find(query, projection).to_list(10000)
     
     # Pour la fidélisation, on ne compte que les visiteurs actifs
     visitors = [v for v in all_visitors if not v.get("tracking_stopped")]
@@ -2226,66 +2875,10 @@ async def get_referent_fidelisation(current_user: dict = Depends(get_current_use
             "monthly_average": 0
         }
     
-    # Déterminer la plage de dates basée sur les présences réelles
-    # Trouver la date min et max des présences
-    all_presence_dates = []
-    for visitor in visitors:
-        for p in visitor.get("presences_dimanche", []):
-            date_val = p.get("date")
-            if date_val and isinstance(date_val, str):
-                all_presence_dates.append(date_val)
-        for p in visitor.get("presences_jeudi", []):
-            date_val = p.get("date")
-            if date_val and isinstance(date_val, str):
-                all_presence_dates.append(date_val)
-    
-    # Parse and validate dates
-    valid_dates = []
-    from datetime import datetime as dt
-    for date_str in all_presence_dates:
-        try:
-            parsed = dt.strptime(date_str, "%Y-%m-%d")
-            valid_dates.append(parsed)
-        except (ValueError, TypeError):
-            # Skip invalid dates
-            continue
-    
-    if not valid_dates:
-        # Pas de présences valides - générer quand même les 52 semaines
-        weeks = list(range(1, 53))
-    else:
-        # Utiliser toutes les 52 semaines de l'année mais ne calculer le taux que pour celles qui ont des présences
-        weeks = list(range(1, 53))
-    
-    weekly_rates = []
-    for week in weeks:
-        # Count presences for this week with WEIGHTED LOGIC (dimanche x2, jeudi x1)
-        total_presences_dimanche = 0
-        total_presences_jeudi = 0
-        for visitor in visitors:
-            for presence in visitor.get("presences_dimanche", []):
-                if get_week_number(presence["date"]) == week and presence.get("present", False):
-                    total_presences_dimanche += 1
-            for presence in visitor.get("presences_jeudi", []):
-                if get_week_number(presence["date"]) == week and presence.get("present", False):
-                    total_presences_jeudi += 1
-        
-        # Calculate rate with PONDÉRATION: dimanche x2, jeudi x1
-        expected_dimanche = total_visitors_actifs * 1  # 1 dimanche par semaine
-        expected_jeudi = total_visitors_actifs * 1  # 1 jeudi par semaine
-        max_weighted = (expected_dimanche * 2) + (expected_jeudi * 1)
-        actual_weighted = (total_presences_dimanche * 2) + (total_presences_jeudi * 1)
-        rate = (actual_weighted / max_weighted * 100) if max_weighted > 0 else 0
-        
-        weekly_rates.append({
-            "week": week,
-            "rate": round(rate, 2),
-            "presences": total_presences_dimanche + total_presences_jeudi,
-            "expected": expected_dimanche + expected_jeudi
-        })
-    
-    # Calculate monthly average
-    monthly_average = sum(w["rate"] for w in weekly_rates) / len(weekly_rates) if weekly_rates else 0
+    # Toutes les 52 semaines de l'année, taux pondérés (dimanche x2, jeudi x1)
+    week_counts = count_weekly_presences(visitors)
+    weekly_rates = weighted_weekly_rates(week_counts, range(1, 53), total_visitors_actifs)
+    monthly_average = average_rate(weekly_rates)
     
     # Compter NA et NC de TOUS les visiteurs
     total_na = len([v for v in all_visitors if "Nouveau Arrivant" in v.get("types", [])])
@@ -2311,47 +2904,87 @@ async def get_admin_fidelisation(week: int = None, month: str = None, current_us
     
     referents = await db.users.find(ref_query, {"_id": 0, "password": 0}).to_list(1000)
     
+    # Une ligne par (référent, mois): assigned_month peut être une liste de mois
+    referent_months = []
+    for r in referents:
+        months = r.get("assigned_month")
+        if not isinstance(months, list):
+            months = [months]
+        for assigned_month in months:
+            if isinstance(assigned_month, str) and assigned_month and (not month or assigned_month == month):
+                referent_months.append((r, assigned_month))
+    if not referent_months:
+        return []
+    
+    # Une seule agrégation pour toutes les promos : effectifs actifs, bornes de dates
+    # et présences par (city, assigned_month, iso_week, type)
+    pipeline = [
+        {"$match": {
+            "city": {"$in": list({r["city"] for r, _ in referent_months})},
+            "assigned_month": {"$in": list({m for _, m in referent_months})},
+            "tracking_stopped": False
+        }},
+        {"$facet": {
+            "visitors": [
+                {"$group": {"_id": {"city": "$city", "assigned_month": "$assigned_month"}, "count": {"$sum": 1}}}
+            ],
+            "presences": [
+                {"$project": {
+                    "city": 1,
+                    "assigned_month": 1,
+                    "presence": {"$concatArrays": [
+                        presence_items_expr("presences_dimanche", "dimanche"),
+                        presence_items_expr("presences_jeudi", "jeudi")
+                    ]}
+                }},
+                {"$unwind": "$presence"},
+                {"$match": {"presence.date": {"$type": "string", "$ne": ""}}},
+                {"$group": {
+                    "_id": {
+                        "city": "$city",
+                        "assigned_month": "$assigned_month",
+                        "iso_week": {"$isoWeek": {"$dateFromString": {"dateString": "$presence.date", "onError": None}}},
+                        "type": "$presence.type"
+                    },
+                    "present": {"$sum": {"$cond": [{"$eq": ["$presence.present", True]}, 1, 0]}},
+                    "min_date": {"$min": "$presence.date"},
+                    "max_date": {"$max": "$presence.date"}
+                }}
+            ]
+        }}
+    ]
+    facets = (await db.visitors.aggregate(pipeline).to_list(1))[0]
+    
+    visitor_counts = {(g["_id"]["city"], g["_id"]["assigned_month"]): g["count"] for g in facets["visitors"]}
+    week_counts = {}
+    date_bounds = {}
+    for g in facets["presences"]:
+        key = (g["_id"]["city"], g["_id"]["assigned_month"])
+        iso_week = g["_id"].get("iso_week")
+        if iso_week is not None and g["present"]:
+            counts = week_counts.setdefault(key, {}).setdefault(iso_week, {"dimanche": 0, "jeudi": 0})
+            counts[g["_id"]["type"]] += g["present"]
+        low, high = date_bounds.get(key, (g["min_date"], g["max_date"]))
+        date_bounds[key] = (min(low, g["min_date"]), max(high, g["max_date"]))
+    
     results = []
     
-    for referent in referents:
-        assigned_month = referent.get("assigned_month")
-        if not assigned_month:
-            continue
-        
-        # Get visitors for this referent  
-        visitors = await db.visitors.find({
-            "city": referent["city"],
-            "assigned_month": assigned_month,
-            "tracking_stopped": False
-        }, {"_id": 0}).to_list(10000)
+    for referent, assigned_month in referent_months:
+        key = (referent["city"], assigned_month)
         
-        total_visitors = len(visitors)
+        total_visitors = visitor_counts.get(key, 0)
         if total_visitors == 0:
             continue
         
-        # Déterminer la plage de dates basée sur les présences réelles
-        # Trouver la date min et max des présences
-        all_presence_dates = []
-        for visitor in visitors:
-            for p in visitor.get("presences_dimanche", []):
-                if p.get("date"):
-                    all_presence_dates.append(p["date"])
-            for p in visitor.get("presences_jeudi", []):
-                if p.get("date"):
-                    all_presence_dates.append(p["date"])
-        
-        if not all_presence_dates:
+        # Déterminer la plage de semaines basée sur les présences réelles
+        if key not in date_bounds:
             # Pas de présences, utiliser le mois assigné
             year, ref_month = map(int, assigned_month.split("-"))
             weeks = get_weeks_in_month(year, ref_month)
         else:
-            # Utiliser la date la plus ancienne des présences pour déterminer les semaines
-            min_date_str = min(all_presence_dates)
-            max_date_str = max(all_presence_dates)
-            min_date = datetime.strptime(min_date_str, "%Y-%m-%d")
-            max_date = datetime.strptime(max_date_str, "%Y-%m-%d")
-            
-            # Calculer toutes les semaines entre min et max
+            # Calculer toutes les semaines entre la première et la dernière présence
+            min_date = datetime.strptime(date_bounds[key][0], "%Y-%m-%d")
+            max_date = datetime.strptime(date_bounds[key][1], "%Y-%m-%d")
             weeks = set()
             current = min_date
             while current <= max_date:
@@ -2359,42 +2992,12 @@ async def get_admin_fidelisation(week: int = None, month: str = None, current_us
                 current += timedelta(days=1)
             weeks = sorted(list(weeks))
         
-        # Filter by month if specified
-        if month and assigned_month != month:
-            continue
-        
         # Filter by week if specified
         if week:
             weeks = [week] if week in weeks else []
         
-        weekly_rates = []
-        for w in weeks:
-            # Count presences with WEIGHTED LOGIC (dimanche x2, jeudi x1)
-            total_presences_dimanche = 0
-            total_presences_jeudi = 0
-            for visitor in visitors:
-                for presence in visitor.get("presences_dimanche", []):
-                    if get_week_number(presence["date"]) == w and presence.get("present", False):
-                        total_presences_dimanche += 1
-                for presence in visitor.get("presences_jeudi", []):
-                    if get_week_number(presence["date"]) == w and presence.get("present", False):
-                        total_presences_jeudi += 1
-            
-            # Calculate rate with PONDÉRATION: dimanche x2, jeudi x1
-            expected_dimanche = total_visitors * 1  # 1 dimanche par semaine
-            expected_jeudi = total_visitors * 1  # 1 jeudi par semaine
-            max_weighted = (expected_dimanche * 2) + (expected_jeudi * 1)
-            actual_weighted = (total_presences_dimanche * 2) + (total_presences_jeudi * 1)
-            rate = (actual_weighted / max_weighted * 100) if max_weighted > 0 else 0
-            
-            weekly_rates.append({
-                "week": w,
-                "rate": round(rate, 2),
-                "presences": total_presences_dimanche + total_presences_jeudi,
-                "expected": expected_dimanche + expected_jeudi
-            })
-        
-        monthly_average = sum(w["rate"] for w in weekly_rates) / len(weekly_rates) if weekly_rates else 0
+        weekly_rates = weighted_weekly_rates(week_counts.get(key, {}), weeks, total_visitors)
+        monthly_average = average_rate(weekly_rates)
         
         results.append({
             "referent_username": referent["username"],
@@ -2738,6 +3341,8 @@ async def create_presence_fi(presence_data: PresenceFICreate, current_user: dict
     elif current_user["role"] not in ["superviseur_promos", "super_admin", "superviseur_fi", "responsable_secteur"] and not is_super_admin(current_user):
         raise HTTPException(status_code=403, detail="Permission denied")
     
+    presence_data.date = canonical_day(presence_data.date)
+    
     # Check if presence already exists for this date
     existing = await db.presences_fi.find_one({
         "membre_fi_id": presence_data.membre_fi_id,
@@ -3094,208 +3699,193 @@ async def debug_data_structure(ville: str = "Dijon", current_user: dict = Depend
     except Exception as e:
         return {"error": str(e)}
 
-@api_router.get("/fi/stats/pasteur")
-async def get_stats_pasteur(
-    annee: Optional[int] = None,
-    mois: Optional[int] = None,
-    current_user: dict = Depends(get_current_user)
-):
-    if current_user["role"] not in ["pasteur", "super_admin"] and not is_super_admin(current_user):
-        raise HTTPException(status_code=403, detail="Only for pasteur or super_admin")
-    
-    # Get all cities
-    cities = await db.cities.find({}, {"_id": 0}).to_list(length=None)
-    
-    stats_by_city = []
-    for city in cities:
-        ville = city["name"]
-        
-        # Get stats for this city
-        secteurs = await db.secteurs.find({"ville": ville}, {"_id": 0}).to_list(length=None)
-        fis = await db.familles_impact.find({"ville": ville}, {"_id": 0}).to_list(length=None)
-        
-        fi_ids = [fi["id"] for fi in fis]
-        membres = await db.membres_fi.find({"fi_id": {"$in": fi_ids}}, {"_id": 0}).to_list(length=None)
-        
-        # Build date filters for année/mois FIRST
-        date_filter_start = None
-        date_filter_end = None
-        if annee and mois:
-            date_filter_start = f"{annee}-{str(mois).zfill(2)}-01"
-            if mois == 12:
-                date_filter_end = f"{annee + 1}-01-01"
-            else:
-                date_filter_end = f"{annee}-{str(mois + 1).zfill(2)}-01"
-        elif annee:
-            date_filter_start = f"{annee}-01-01"
+# Nombre de villes calculées en parallèle pour /fi/stats/pasteur
+PASTEUR_STATS_CONCURRENCY = 4
+
+async def _get_city_pasteur_stats(ville: str, annee: Optional[int], mois: Optional[int]) -> dict:
+    """Statistiques d'une ville pour la vue pasteur, calculées par agrégations côté serveur"""
+    # Build date filters for année/mois FIRST
+    date_filter_start = None
+    date_filter_end = None
+    if annee and mois:
+        date_filter_start = f"{annee}-{str(mois).zfill(2)}-01"
+        if mois == 12:
             date_filter_end = f"{annee + 1}-01-01"
-        
-        # Get visitors (Personnes Reçues) - FILTERED by année/mois if provided
-        visitor_query = {"city": ville}
-        
-        # Only apply date filter if both annee and mois are provided (specific month)
-        # Otherwise, load all visitors for the city
-        if annee and mois and date_filter_start and date_filter_end:
-            # Try to filter by assigned_month first (format: "2025-11")
-            visitor_query["$or"] = [
-                {"assigned_month": f"{annee}-{str(mois).zfill(2)}"},
-                {"assigned_month": {"$regex": f"^{annee}-{str(mois).zfill(2)}"}},
-                # Fallback: check if assigned_month contains the year-month pattern
-                {"assigned_month": {"$regex": f"{annee}-{str(mois).zfill(2)}"}}
-            ]
-        elif annee and date_filter_start and date_filter_end:
-            # Filter by year only
-            visitor_query["$or"] = [
-                {"assigned_month": {"$regex": f"^{annee}-"}},
-                {"assigned_month": {"$regex": f"{annee}"}}
-            ]
-        
-        visitors = await db.visitors.find(visitor_query, {"_id": 0}).to_list(length=None)
-        
-        # Count by status using "types" field (not "statut")
-        total_visitors = len(visitors)
-        de_passage_count = len([v for v in visitors if "De Passage" in v.get("types", [])])
-        resident_count = len([v for v in visitors if "De Passage" not in v.get("types", [])])
-        na_count = total_visitors  # ALL visitors are NA
-        nc_count = len([v for v in visitors if "Nouveau Converti" in v.get("types", [])])
-        
-        # Promotions fidelisation - Calculate from presences_dimanche and presences_jeudi
-        # This is the SAME calculation as Promotion dashboard (fidélisation générale)
-        # FILTERED by date if provided
-        total_presences_dimanche = 0
-        total_presences_jeudi = 0
-        for visitor in visitors:
-            presences_dim = visitor.get("presences_dimanche", [])
-            presences_jeu = visitor.get("presences_jeudi", [])
-            
-            # Filter presences by date if année/mois are provided
-            if date_filter_start and date_filter_end:
-                presences_dim = [p for p in presences_dim if date_filter_start <= p.get("date", "") < date_filter_end]
-                presences_jeu = [p for p in presences_jeu if date_filter_start <= p.get("date", "") < date_filter_end]
-            
-            total_presences_dimanche += len([p for p in presences_dim if p.get("present")])
-            total_presences_jeudi += len([p for p in presences_jeu if p.get("present")])
-        
-        # Calculate number of sundays and thursdays in the period
-        if annee and mois:
-            import calendar
-            num_days = calendar.monthrange(annee, mois)[1]
-            num_sundays = sum(1 for day in range(1, num_days + 1) if datetime(annee, mois, day).weekday() == 6)
-            num_thursdays = sum(1 for day in range(1, num_days + 1) if datetime(annee, mois, day).weekday() == 3)
         else:
-            num_sundays = 4
-            num_thursdays = 4
-        
-        expected_dimanche = total_visitors * num_sundays if total_visitors > 0 else 0
-        expected_jeudi = total_visitors * num_thursdays if total_visitors > 0 else 0
-        
-        taux_dimanche = (total_presences_dimanche / expected_dimanche) if expected_dimanche > 0 else 0
-        taux_jeudi = (total_presences_jeudi / expected_jeudi) if expected_jeudi > 0 else 0
-        promos_fidelisation = ((taux_dimanche * 2) + (taux_jeudi * 1)) / 2 * 100
-        
-        # Cultes stats - Use culte_stats collection (not cultes) - FILTERED by année/mois
-        culte_query = {"ville": ville}
-        if date_filter_start and date_filter_end:
-            # Support multiple date formats: string or datetime
-            culte_query["$or"] = [
-                {"date": {"$gte": date_filter_start, "$lt": date_filter_end}},
-                # Also check if date field is datetime object
-                {"date": {"$gte": datetime.fromisoformat(date_filter_start.replace('Z', '+00:00')) if isinstance(date_filter_start, str) else date_filter_start,
-                          "$lt": datetime.fromisoformat(date_filter_end.replace('Z', '+00:00')) if isinstance(date_filter_end, str) else date_filter_end}}
-            ]
-        
-        cultes = await db.culte_stats.find(culte_query, {"_id": 0}).to_list(length=None)
-        total_adultes = sum([c.get("nombre_adultes", 0) for c in cultes])
-        total_enfants = sum([c.get("nombre_enfants", 0) for c in cultes])
-        total_stars = sum([c.get("nombre_stars", 0) for c in cultes])
-        total_services = len(cultes)
-        
-        moy_adultes = round(total_adultes / total_services, 1) if total_services > 0 else 0
-        moy_enfants = round(total_enfants / total_services, 1) if total_services > 0 else 0
-        moy_stars = round(total_stars / total_services, 1) if total_services > 0 else 0
-        
-        # Cultes fidelisation (same as promotions fidelisation)
-        cultes_fidelisation = round(promos_fidelisation, 2)
-        
-        # Fidelisation Familles d'Impact - FILTERED by année/mois
-        membre_ids = [m["id"] for m in membres]
-        presences_fi_query = {"membre_fi_id": {"$in": membre_ids}}
-        if date_filter_start and date_filter_end:
-            presences_fi_query["date"] = {"$gte": date_filter_start, "$lt": date_filter_end}
-        
-        presences_fi = await db.presences_fi.find(presences_fi_query, {"_id": 0}).to_list(length=None)
-        
-        unique_jeudis_fi = len(set([p["date"] for p in presences_fi]))
-        total_presences_fi = sum([1 for p in presences_fi if p["present"]])
-        max_possible_fi = len(membres) * unique_jeudis_fi if unique_jeudis_fi > 0 else 0
-        fidelisation_fi = (total_presences_fi / max_possible_fi * 100) if max_possible_fi > 0 else 0
-        
-        # Dynamique d'Évangélisation stats - FILTERED by année/mois
-        evangel_query = {"ville": ville}
-        if date_filter_start and date_filter_end:
-            evangel_query["date"] = {"$gte": date_filter_start, "$lt": date_filter_end}
-        
-        # Get all evangelisation data for the city with filters
-        all_evangel = await db.evangelisation.find(evangel_query, {"_id": 0}).to_list(length=None)
-        
-        # Separate by type
-        evangel_eglise = [e for e in all_evangel if e.get("eglise") or e.get("type") == "eglise"]
-        evangel_fi = [e for e in all_evangel if e.get("familles_impact") or e.get("type") == "familles_impact"]
-        
-        # Aggregate evangelisation data for eglise
-        evangel_eglise_totals = {
-            "gagneurs_ame": sum([e.get("eglise", {}).get("nombre_gagneurs_ame", 0) for e in evangel_eglise]),
-            "personnes_receptives": sum([e.get("eglise", {}).get("nombre_personnes_receptives", 0) for e in evangel_eglise]),
-            "priere_salut": sum([e.get("eglise", {}).get("nombre_priere_salut", 0) for e in evangel_eglise]),
-            "contacts_pris": sum([e.get("eglise", {}).get("nombre_contacts_pris", 0) for e in evangel_eglise]),
-            "ames_invitees": sum([e.get("eglise", {}).get("nombre_ames_invitees", 0) for e in evangel_eglise]),
-            "miracles": sum([e.get("eglise", {}).get("nombre_miracles", 0) for e in evangel_eglise])
-        }
-        
-        # Aggregate evangelisation data for familles impact
-        evangel_fi_totals = {
-            "gagneurs_ame": sum([e.get("familles_impact", {}).get("nombre_gagneurs_ame", 0) for e in evangel_fi]),
-            "personnes_receptives": sum([e.get("familles_impact", {}).get("nombre_personnes_receptives", 0) for e in evangel_fi]),
-            "priere_salut": sum([e.get("familles_impact", {}).get("nombre_priere_salut", 0) for e in evangel_fi]),
-            "contacts_pris": sum([e.get("familles_impact", {}).get("nombre_contacts_pris", 0) for e in evangel_fi]),
-            "ames_invitees": sum([e.get("familles_impact", {}).get("nombre_ames_invitees", 0) for e in evangel_fi]),
-            "miracles": sum([e.get("familles_impact", {}).get("nombre_miracles", 0) for e in evangel_fi])
-        }
-        
-        stats_by_city.append({
-            "ville": ville,
-            "nombre_secteurs": len(secteurs),
-            "nombre_fi": len(fis),
-            "nombre_membres": len(membres),
-            "promotions": {
-                "total_personnes": total_visitors,
-                "de_passage": de_passage_count,
-                "resident": resident_count,
-                "na": na_count,
-                "nc": nc_count,
-                "fidelisation": round(promos_fidelisation, 2)
-            },
-            "familles_impact": {
-                "secteurs": len(secteurs),
-                "familles": len(fis),
-                "membres": len(membres),
-                "fidelisation": round(fidelisation_fi, 2)
-            },
-            "cultes": {
-                "moy_adultes": moy_adultes,
-                "moy_enfants": moy_enfants,
-                "moy_stars": moy_stars,
-                "total_services": total_services
-            },
-            "evangelisation": {
-                "eglise": evangel_eglise_totals,
-                "familles_impact": evangel_fi_totals
-            }
-        })
+            date_filter_end = f"{annee}-{str(mois + 1).zfill(2)}-01"
+    elif annee:
+        date_filter_start = f"{annee}-01-01"
+        date_filter_end = f"{annee + 1}-01-01"
+    
+    # Get visitors (Personnes Reçues) - FILTERED by année/mois if provided
+    visitor_query = {"city": ville}
+    
+    # Filter by promo: exact month if annee and mois are provided, whole year if only annee
+    # Otherwise, load all visitors for the city
+    if annee and mois:
+        visitor_query["assigned_month"] = f"{annee}-{str(mois).zfill(2)}"
+    elif annee:
+        # Filter by year only
+        visitor_query["promo_year"] = annee
+    
+    visitors_pipeline = [
+        {"$match": visitor_query},
+        {"$group": {
+            "_id": None,
+            "total": {"$sum": 1},
+            "de_passage": {"$sum": {"$cond": [{"$in": ["De Passage", {"$ifNull": ["$types", []]}]}, 1, 0]}},
+            "nc": {"$sum": {"$cond": [{"$in": ["Nouveau Converti", {"$ifNull": ["$types", []]}]}, 1, 0]}},
+            # Presences FILTERED by date if provided
+            "presences_dimanche": {"$sum": present_count_expr("presences_dimanche", date_filter_start, date_filter_end)},
+            "presences_jeudi": {"$sum": present_count_expr("presences_jeudi", date_filter_start, date_filter_end)}
+        }}
+    ]
+    
+    # Cultes stats - Use culte_stats collection (not cultes) - FILTERED by année/mois
+    culte_query = {"ville": ville}
+    if date_filter_start and date_filter_end:
+        # Dates canoniques "YYYY-MM-DD" (cf. migration canonical_date_strings)
+        culte_query["date"] = {"$gte": date_filter_start, "$lt": date_filter_end}
+    cultes_pipeline = [
+        {"$match": culte_query},
+        {"$group": {
+            "_id": None,
+            "adultes": {"$sum": "$nombre_adultes"},
+            "enfants": {"$sum": "$nombre_enfants"},
+            "stars": {"$sum": "$nombre_stars"},
+            "services": {"$sum": 1}
+        }}
+    ]
+    
+    # Dynamique d'Évangélisation stats - FILTERED by année/mois
+    visitors_stats, cultes_stats, evangel_stats, nombre_secteurs, fi_ids = await asyncio.gather(
+        db.visitors.aggregate(visitors_pipeline).to_list(1),
+        db.culte_stats.aggregate(cultes_pipeline).to_list(1),
+        evangelisation_totals(ville, annee, mois),
+        db.secteurs.count_documents({"ville": ville}),
+        db.familles_impact.distinct("id", {"ville": ville})
+    )
+    visitors_stats = visitors_stats[0] if visitors_stats else {}
+    cultes_stats = cultes_stats[0] if cultes_stats else {}
+    
+    membre_ids = await db.membres_fi.distinct("id", {"fi_id": {"$in": fi_ids}})
+    
+    # Count by status using "types" field (not "statut")
+    total_visitors = visitors_stats.get("total", 0)
+    de_passage_count = visitors_stats.get("de_passage", 0)
+    resident_count = total_visitors - de_passage_count
+    na_count = total_visitors  # ALL visitors are NA
+    nc_count = visitors_stats.get("nc", 0)
+    
+    # Promotions fidelisation - Calculate from presences_dimanche and presences_jeudi
+    # This is the SAME calculation as Promotion dashboard (fidélisation générale)
+    total_presences_dimanche = visitors_stats.get("presences_dimanche", 0)
+    total_presences_jeudi = visitors_stats.get("presences_jeudi", 0)
+    
+    # Calculate number of sundays and thursdays in the period
+    if annee and mois:
+        import calendar
+        num_days = calendar.monthrange(annee, mois)[1]
+        num_sundays = sum(1 for day in range(1, num_days + 1) if datetime(annee, mois, day).weekday() == 6)
+        num_thursdays = sum(1 for day in range(1, num_days + 1) if datetime(annee, mois, day).weekday() == 3)
+    else:
+        num_sundays = 4
+        num_thursdays = 4
+    
+    expected_dimanche = total_visitors * num_sundays if total_visitors > 0 else 0
+    expected_jeudi = total_visitors * num_thursdays if total_visitors > 0 else 0
+    
+    taux_dimanche = (total_presences_dimanche / expected_dimanche) if expected_dimanche > 0 else 0
+    taux_jeudi = (total_presences_jeudi / expected_jeudi) if expected_jeudi > 0 else 0
+    promos_fidelisation = ((taux_dimanche * 2) + (taux_jeudi * 1)) / 2 * 100
+    
+    total_services = cultes_stats.get("services", 0)
+    moy_adultes = round(cultes_stats.get("adultes", 0) / total_services, 1) if total_services > 0 else 0
+    moy_enfants = round(cultes_stats.get("enfants", 0) / total_services, 1) if total_services > 0 else 0
+    moy_stars = round(cultes_stats.get("stars", 0) / total_services, 1) if total_services > 0 else 0
+    
+    # Fidelisation Familles d'Impact - FILTERED by année/mois
+    presences_fi_query = {"membre_fi_id": {"$in": membre_ids}}
+    if date_filter_start and date_filter_end:
+        presences_fi_query["date"] = {"$gte": date_filter_start, "$lt": date_filter_end}
+    
+    presences_fi_stats = await db.presences_fi.aggregate([
+        {"$match": presences_fi_query},
+        {"$group": {
+            "_id": None,
+            "dates": {"$addToSet": "$date"},
+            "present": {"$sum": {"$cond": ["$present", 1, 0]}}
+        }}
+    ]).to_list(1)
+    presences_fi_stats = presences_fi_stats[0] if presences_fi_stats else {}
+    
+    unique_jeudis_fi = len(presences_fi_stats.get("dates", []))
+    total_presences_fi = presences_fi_stats.get("present", 0)
+    max_possible_fi = len(membre_ids) * unique_jeudis_fi if unique_jeudis_fi > 0 else 0
+    fidelisation_fi = (total_presences_fi / max_possible_fi * 100) if max_possible_fi > 0 else 0
     
     return {
-        "stats_by_city": stats_by_city
+        "ville": ville,
+        "nombre_secteurs": nombre_secteurs,
+        "nombre_fi": len(fi_ids),
+        "nombre_membres": len(membre_ids),
+        "promotions": {
+            "total_personnes": total_visitors,
+            "de_passage": de_passage_count,
+            "resident": resident_count,
+            "na": na_count,
+            "nc": nc_count,
+            "fidelisation": round(promos_fidelisation, 2)
+        },
+        "familles_impact": {
+            "secteurs": nombre_secteurs,
+            "familles": len(fi_ids),
+            "membres": len(membre_ids),
+            "fidelisation": round(fidelisation_fi, 2)
+        },
+        "cultes": {
+            "moy_adultes": moy_adultes,
+            "moy_enfants": moy_enfants,
+            "moy_stars": moy_stars,
+            "total_services": total_services
+        },
+        "evangelisation": {
+            "eglise": {key: evangel_stats["eglise"][field] for key, field in EVANGELISATION_FIELDS},
+            "familles_impact": {key: evangel_stats["familles_impact"][field] for key, field in EVANGELISATION_FIELDS}
+        }
+    }
+
+@api_router.get("/fi/stats/pasteur")
+async def get_stats_pasteur(
+    annee: Optional[int] = None,
+    mois: Optional[int] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] not in ["pasteur", "super_admin"] and not is_super_admin(current_user):
+        raise HTTPException(status_code=403, detail="Only for pasteur or super_admin")
+    
+    cache = response_cache("stats_pasteur", ttl=120)
+    cached = cache.get((annee, mois))
+    if cached is not None:
+        return cached
+    
+    # Get all cities
+    cities = await db.cities.find({}, {"_id": 0, "name": 1}).to_list(length=None)
+    
+    # Villes calculées en parallèle, avec une concurrence bornée
+    semaphore = asyncio.Semaphore(PASTEUR_STATS_CONCURRENCY)
+    
+    async def city_stats(ville: str) -> dict:
+        async with semaphore:
+            return await _get_city_pasteur_stats(ville, annee, mois)
+    
+    stats_by_city = await asyncio.gather(*(city_stats(city["name"]) for city in cities))
+    
+    result = {
+        "stats_by_city": list(stats_by_city)
     }
+    cache[(annee, mois)] = result
+    return result
 
 # ==================== NOTIFICATIONS ====================
 
@@ -3464,13 +4054,14 @@ async def get_promotions_detailed(ville: str = None, mois: str = None, annee: st
     - Total NA vs NC vs DP
     - Canal d'arrivée (4 canaux spécifiques)
     - Détails quotidiens par date
+    
+    Lit uniquement les compteurs pré-agrégés de promo_rollups.
     """
-    from datetime import datetime
     import calendar
     
     # Only super_admin, pasteur, and responsable_eglise can access
     
-    # Get all visitors INCLUDING tracking_stopped (pour compter les suivis arrêtés)
+    # Rollups de toutes les promos, y compris les suivis arrêtés
     base_query = {}
     
     # For responsable_eglise, force filter by their city
@@ -3480,27 +4071,55 @@ async def get_promotions_detailed(ville: str = None, mois: str = None, annee: st
     elif ville and ville != "all":
         base_query["city"] = ville
     
-    # Get ALL visitors (y compris tracking_stopped pour les statistiques)
-    all_visitors = await db.visitors.find(base_query, {"_id": 0}).to_list(10000)
+    rows = await db.promo_rollups.find(base_query, {"_id": 0}).to_list(length=None)
     
-    # Filtrer les visiteurs pour les indicateurs globaux si mois et/ou année spécifiés
-    visitors_for_summary = all_visitors
-    if annee and annee != "all":
-        if mois and mois != "all":
-            # Filtrer par mois ET année
-            visitors_for_summary = [v for v in all_visitors if v.get("assigned_month", "").startswith(f"{annee}-{mois}")]
-        else:
-            # Filtrer par année seulement
-            visitors_for_summary = [v for v in all_visitors if v.get("assigned_month", "").startswith(f"{annee}-")]
-    elif mois and mois != "all":
-        # Filtrer par mois seulement (tous les années)
-        visitors_for_summary = [v for v in all_visitors if v.get("assigned_month", "").split("-")[1] == mois if "-" in v.get("assigned_month", "")]
+    filter_annee = annee and annee != "all"
+    filter_mois = mois and mois != "all"
     
-    # Utiliser visitors_for_summary pour les stats (filtrées)
-    visitors = visitors_for_summary if (annee and annee != "all") or (mois and mois != "all") else all_visitors
+    def promo_selected(assigned_month: str) -> bool:
+        """Filtre mois/année appliqué sur la promo (assigned_month)"""
+        if filter_annee:
+            if filter_mois:
+                return assigned_month.startswith(f"{annee}-{mois}")
+            return assigned_month.startswith(f"{annee}-")
+        if filter_mois:
+            return "-" in assigned_month and assigned_month.split("-")[1] == mois
+        return True
+    
+    # Mois des présences retenu (uniquement si mois ET année sont spécifiés)
+    presence_month = f"{annee}-{mois.zfill(2)}" if filter_annee and filter_mois else None
+    
+    # Group rollup rows by assigned_month (Promo) - on garde les promos filtrées
+    promos_by_month = {}
+    presences_by_month = {}
+    for row in rows:
+        month = row.get("assigned_month") or "N/A"
+        if row.get("presence_month") is None:
+            if row.get("total_all", 0) <= 0 or not promo_selected(month):
+                continue
+            merged = promos_by_month.setdefault(month, {
+                "total_all": 0, "active": 0, "stopped": 0, "nc": 0, "dp": 0, "residents": 0,
+                "canal": {}, "daily": {}, "suivis_arretes": []
+            })
+            for field in ["total_all", "active", "stopped", "nc", "dp", "residents"]:
+                merged[field] += row.get(field, 0)
+            for channel, count in (row.get("canal") or {}).items():
+                merged["canal"][channel] = merged["canal"].get(channel, 0) + count
+            for date_str, counts in (row.get("daily") or {}).items():
+                day = merged["daily"].setdefault(date_str, {})
+                for field, count in counts.items():
+                    day[field] = day.get(field, 0) + count
+            merged["suivis_arretes"].extend(
+                {"name": entry.get("name"), "reason": entry.get("reason")}
+                for entry in row.get("suivis_arretes") or []
+            )
+        elif presence_month is None or row["presence_month"] == presence_month:
+            counts = presences_by_month.setdefault(month, {"present_dimanche": 0, "present_jeudi": 0})
+            counts["present_dimanche"] += row.get("present_dimanche", 0)
+            counts["present_jeudi"] += row.get("present_jeudi", 0)
     
     # Déterminer le mois filtré pour le calcul des dimanches/jeudis
-    if mois and mois != "all" and annee and annee != "all":
+    if filter_mois and filter_annee:
         filter_year = int(annee)
         filter_month = int(mois)
         # Compter le nombre de dimanches et jeudis dans ce mois
@@ -3512,87 +4131,15 @@ async def get_promotions_detailed(ville: str = None, mois: str = None, annee: st
         num_sundays = 4
         num_thursdays = 4
     
-    # Group by assigned_month (Promo) - on garde les promos filtrées
-    promos_by_month = {}
-    for visitor in visitors:
-        month = visitor.get("assigned_month", "N/A")
-        if month not in promos_by_month:
-            promos_by_month[month] = {
-                "month": month,
-                "total_visitors": 0,
-                "total_visitors_all": 0,  # Inclut les suivis arrêtés
-                "na_count": 0,
-                "nc_count": 0,
-                "dp_count": 0,
-                "residents_count": 0,
-                "visitors": [],
-                "visitors_actifs": [],  # Seulement ceux avec suivi actif
-                "suivis_arretes": []
-            }
-        
-        # Compter TOUS les visiteurs (y compris arrêtés) pour les stats globales
-        promos_by_month[month]["total_visitors_all"] += 1
-        promos_by_month[month]["visitors"].append(visitor)
-        
-        # LOGIQUE NOUVELLE: NA = TOUTES les personnes reçues (car toute personne reçue est NA)
-        promos_by_month[month]["na_count"] += 1
-        
-        # Compter seulement les visiteurs actifs (pas arrêtés) pour "nbre_pers_suivis"
-        if not visitor.get("tracking_stopped"):
-            promos_by_month[month]["total_visitors"] += 1
-            promos_by_month[month]["visitors_actifs"].append(visitor)
-        
-        # Count NC vs DP (tous, même arrêtés)
-        types = visitor.get("types", [])
-        if "Nouveau Converti" in types:
-            promos_by_month[month]["nc_count"] += 1
-        if "De Passage" in types:
-            promos_by_month[month]["dp_count"] += 1
-        
-        # Count residents (not DP)
-        if "De Passage" not in types:
-            promos_by_month[month]["residents_count"] += 1
-        
-        # Track stopped tracking
-        if visitor.get("tracking_stopped"):
-            promos_by_month[month]["suivis_arretes"].append({
-                "name": f"{visitor.get('firstname', '')} {visitor.get('lastname', '')}",
-                "reason": visitor.get("stop_reason", "Non spécifié")
-            })
-    
     # Calculate fidelisation for each promo based on FILTERED month
     promos_stats = []
     for month, data in sorted(promos_by_month.items()):
-        total = data["total_visitors"]
-        
-        # Filtrer les présences par mois/année si spécifié
-        total_presences_dimanche = 0
-        total_presences_jeudi = 0
-        
-        if total > 0:
-            # Compter seulement les présences des visiteurs ACTIFS (pas arrêtés)
-            for visitor in data["visitors_actifs"]:
-                # Filtrer les présences dimanche par mois/année
-                presences_dim = visitor.get("presences_dimanche", [])
-                if mois and mois != "all" and annee and annee != "all":
-                    # Normaliser le mois avec zéro devant si nécessaire
-                    mois_padded = mois.zfill(2)
-                    # Filtrer d'abord par date, puis compter les présents
-                    presences_dim_filtered = [p for p in presences_dim if p.get("date", "").startswith(f"{annee}-{mois_padded}") and p.get("present")]
-                    total_presences_dimanche += len(presences_dim_filtered)
-                else:
-                    total_presences_dimanche += len([p for p in presences_dim if p.get("present")])
-                
-                # Filtrer les présences jeudi par mois/année
-                presences_jeu = visitor.get("presences_jeudi", [])
-                if mois and mois != "all" and annee and annee != "all":
-                    # Normaliser le mois avec zéro devant si nécessaire
-                    mois_padded = mois.zfill(2)
-                    # Filtrer d'abord par date, puis compter les présents
-                    presences_jeu_filtered = [p for p in presences_jeu if p.get("date", "").startswith(f"{annee}-{mois_padded}") and p.get("present")]
-                    total_presences_jeudi += len(presences_jeu_filtered)
-                else:
-                    total_presences_jeudi += len([p for p in presences_jeu if p.get("present")])
+        total = data["active"]
+        
+        # Présences des visiteurs ACTIFS (pas arrêtés), filtrées par mois/année si spécifié
+        presences = presences_by_month.get(month, {}) if total > 0 else {}
+        total_presences_dimanche = presences.get("present_dimanche", 0)
+        total_presences_jeudi = presences.get("present_jeudi", 0)
         
         # Expected = nombre de personnes × nombre de dimanches/jeudis dans le mois filtré
         expected_dimanche = total * num_sundays
@@ -3604,17 +4151,17 @@ async def get_promotions_detailed(ville: str = None, mois: str = None, annee: st
         fidelisation = ((taux_dimanche * 2) + (taux_jeudi * 1)) / 2 * 100
         
         # CORRECTION: Pers. Suivies = Pers. Reçues (total_all) - Suivis Arrêtés
-        nbre_pers_suivis = data["total_visitors_all"] - len(data["suivis_arretes"])
+        nbre_pers_suivis = data["total_all"] - data["stopped"]
         
         promos_stats.append({
             "month": month,
             "nbre_pers_suivis": nbre_pers_suivis,  # Pers. Reçues - Arrêtés
-            "total_visitors": data["total_visitors_all"],  # Total incluant arrêtés
-            "na_count": data["na_count"],
-            "nc_count": data["nc_count"],
-            "dp_count": data["dp_count"],
-            "residents_count": data["residents_count"],
-            "suivis_arretes_count": len(data["suivis_arretes"]),
+            "total_visitors": data["total_all"],  # Total incluant arrêtés
+            "na_count": data["total_all"],  # NA = toutes les personnes reçues
+            "nc_count": data["nc"],
+            "dp_count": data["dp"],
+            "residents_count": data["residents"],
+            "suivis_arretes_count": data["stopped"],
             "suivis_arretes_details": data["suivis_arretes"],
             "fidelisation": round(fidelisation, 1),
             "total_presences_dimanche": total_presences_dimanche,
@@ -3624,59 +4171,39 @@ async def get_promotions_detailed(ville: str = None, mois: str = None, annee: st
         })
     
     # Calculate Canal d'arrivée statistics (4 canaux spécifiques) - FILTRÉ par mois/année
-    canal_counts = {
-        "Evangelisation": 0,
-        "Réseaux sociaux": 0,
-        "Invitation par un membre (hors evangelisation)": 0,
-        "Par soi même": 0
-    }
-    for visitor in visitors_for_summary:
-        canal = visitor.get("arrival_channel", "")
-        if canal in canal_counts:
-            canal_counts[canal] += 1
+    canal_counts = {channel: 0 for channel in PROMO_CHANNELS}
+    for data in promos_by_month.values():
+        for channel, count in data["canal"].items():
+            if channel in canal_counts:
+                canal_counts[channel] += count
     
     # Global totals - FILTRÉS par mois/année
     # LOGIQUE NOUVELLE: NA = Total personnes reçues (tous sont NA au départ)
-    total_personnes_recues = len(visitors_for_summary)  # Tous les visiteurs (même arrêtés)
+    total_personnes_recues = sum(p["total_all"] for p in promos_by_month.values())  # Tous les visiteurs (même arrêtés)
     total_na = total_personnes_recues  # NA = Total personnes reçues
-    total_nc = len([v for v in visitors_for_summary if "Nouveau Converti" in v.get("types", [])])
-    total_dp = len([v for v in visitors_for_summary if "De Passage" in v.get("types", [])])
-    total_suivis_arretes = len([v for v in visitors_for_summary if v.get("tracking_stopped")])
+    total_nc = sum(p["nc"] for p in promos_by_month.values())
+    total_dp = sum(p["dp"] for p in promos_by_month.values())
+    total_suivis_arretes = sum(p["stopped"] for p in promos_by_month.values())
     total_personnes_suivies = total_na - total_suivis_arretes  # Personnes suivies = NA - Suivis arrêtés
     
     # Avg fidelisation reste basé sur promos_stats (toutes les promos visibles)
     avg_fidelisation = sum(p["fidelisation"] for p in promos_stats) / len(promos_stats) if promos_stats else 0
     
-    # Détail des personnes reçues par jour (TOUJOURS affiché)
-    from datetime import datetime
-    from collections import defaultdict
-    daily_data = defaultdict(lambda: {
-        "total": 0, "dp": 0, "residents": 0, "na": 0, "nc": 0
-    })
-    
-    # Group by visit_date avec filtre optionnel par mois/année
-    for visitor in visitors:
-        visit_date = visitor.get("visit_date", "")
-        if visit_date:
-            # Appliquer filtre mois/année si spécifié
-            if mois and mois != "all" and annee and annee != "all":
-                if not visit_date.startswith(f"{annee}-{mois}"):
-                    continue
-            
-            types = visitor.get("types", [])
-            daily_data[visit_date]["total"] += 1
-            if "De Passage" in types:
-                daily_data[visit_date]["dp"] += 1
-            else:
-                daily_data[visit_date]["residents"] += 1
-            if "Nouveau Arrivant" in types:
-                daily_data[visit_date]["na"] += 1
-            if "Nouveau Converti" in types:
-                daily_data[visit_date]["nc"] += 1
+    # Détail des personnes reçues par jour (TOUJOURS affiché), avec filtre optionnel par mois/année
+    daily_data = {}
+    for data in promos_by_month.values():
+        for date_str, counts in data["daily"].items():
+            if filter_mois and filter_annee and not date_str.startswith(f"{annee}-{mois}"):
+                continue
+            day = daily_data.setdefault(date_str, {"total": 0, "dp": 0, "residents": 0, "na": 0, "nc": 0})
+            for field in day:
+                day[field] += counts.get(field, 0)
     
     # Sort by date
     daily_details = []
     for date_str, data in sorted(daily_data.items()):
+        if data["total"] <= 0:
+            continue
         daily_details.append({
             "date": date_str,
             "total_personnes_recues": data["total"],
@@ -3706,8 +4233,11 @@ async def get_promotions_detailed(ville: str = None, mois: str = None, annee: st
     }
 
 @api_router.get("/analytics/visitors-table")
-async def get_visitors_table(ville: str = None, current_user: dict = Depends(get_current_user)):
-    """Get complete visitors table with all details for Super Admin/Pasteur"""
+async def get_visitors_table(ville: str = None, compact: bool = False, current_user: dict = Depends(get_current_user)):
+    """Get complete visitors table with all details for Super Admin/Pasteur
+    
+    compact=true omet les tableaux de présences et de commentaires (seuls les compteurs sont renvoyés).
+    """
     # Only super_admin, pasteur, and responsable_eglise can access
     
     # Filtrer par ville si spécifié
@@ -3715,36 +4245,45 @@ async def get_visitors_table(ville: str = None, current_user: dict = Depends(get
     if ville:
         query["city"] = ville
     
-    visitors = await db.visitors.find(query, {"_id": 0}).to_list(10000)
+    pipeline = [
+        {"$match": query},
+        {"$project": {"_id": 0}},
+        # Calculate total presences
+        {"$addFields": {
+            "presences_dimanche_count": present_count_expr("presences_dimanche"),
+            "presences_jeudi_count": present_count_expr("presences_jeudi"),
+            "comments_count": {"$size": {"$ifNull": ["$comments", []]}}
+        }},
+        {"$addFields": {"total_presences": {"$add": ["$presences_dimanche_count", "$presences_jeudi_count"]}}}
+    ]
+    if compact:
+        pipeline.append({"$project": {"presences_dimanche": 0, "presences_jeudi": 0, "comments": 0}})
+    pipeline.append({"$limit": 10000})
+    
+    visitors = await db.visitors.aggregate(pipeline).to_list(length=None)
+    
+    # Check if assigned to FI: two bulk fetches joined in memory
+    visitor_ids = [v["id"] for v in visitors if v.get("id")]
+    membres = await db.membres_fi.find(
+        {"nouveau_arrivant_id": {"$in": visitor_ids}},
+        {"_id": 0, "nouveau_arrivant_id": 1, "fi_id": 1}
+    ).to_list(length=None)
+    fi_by_visitor = {}
+    for membre in membres:
+        fi_by_visitor.setdefault(membre["nouveau_arrivant_id"], membre.get("fi_id"))
+    
+    fis = await db.familles_impact.find(
+        {"id": {"$in": list(set(fi_by_visitor.values()))}},
+        {"_id": 0, "id": 1, "nom": 1}
+    ).to_list(length=None)
+    fis_by_id = {fi["id"]: fi for fi in fis}
     
-    # Enrich with assigned FI info
-    enriched_visitors = []
     for visitor in visitors:
-        # Calculate total presences
-        presences_dimanche_count = len([p for p in visitor.get("presences_dimanche", []) if p.get("present")])
-        presences_jeudi_count = len([p for p in visitor.get("presences_jeudi", []) if p.get("present")])
-        
-        # Check if assigned to FI
-        membre = await db.membres_fi.find_one({"nouveau_arrivant_id": visitor["id"]}, {"_id": 0})
-        assigned_fi = None
-        assigned_fi_id = None
-        if membre:
-            fi = await db.familles_impact.find_one({"id": membre["fi_id"]}, {"_id": 0})
-            if fi:
-                assigned_fi = fi.get("nom", "N/A")
-                assigned_fi_id = fi.get("id")
-        
-        enriched_visitors.append({
-            **visitor,
-            "presences_dimanche_count": presences_dimanche_count,
-            "presences_jeudi_count": presences_jeudi_count,
-            "total_presences": presences_dimanche_count + presences_jeudi_count,
-            "assigned_fi": assigned_fi,
-            "assigned_fi_id": assigned_fi_id,
-            "comments_count": len(visitor.get("comments", []))
-        })
+        fi = fis_by_id.get(fi_by_visitor.get(visitor.get("id")))
+        visitor["assigned_fi"] = fi.get("nom", "N/A") if fi else None
+        visitor["assigned_fi_id"] = fi.get("id") if fi else None
     
-    return enriched_visitors
+    return visitors
 
 @api_router.get("/analytics/fi-detailed")
 async def get_fi_detailed(ville: str = None, date: str = None, current_user: dict = Depends(get_current_user)):
@@ -3780,32 +4319,50 @@ async def get_fi_detailed(ville: str = None, date: str = None, current_user: dic
         presences_query["date"] = date
     if fi_ids:
         presences_query["fi_id"] = {"$in": fi_ids}
-    presences = await db.presences_fi.find(presences_query, {"_id": 0}).to_list(100000)
+    presences = await db.presences_fi.find(
+        presences_query,
+        {"_id": 0, "fi_id": 1, "membre_fi_id": 1, "present": 1}
+    ).to_list(100000)
+    
+    # Pré-passe unique : FI par secteur, membres par FI, présences par (fi_id, membre_fi_id)
+    familles_by_secteur = {}
+    for fi in familles:
+        familles_by_secteur.setdefault(fi.get("secteur_id"), []).append(fi)
+    
+    membres_by_fi = {}
+    for membre in membres:
+        membres_by_fi.setdefault(membre.get("fi_id"), []).append(membre)
+    
+    presents_by_fi = {}
+    presents_by_membre = {}
+    for p in presences:
+        if not p.get("present"):
+            continue
+        fi_id = p.get("fi_id")
+        presents_by_fi[fi_id] = presents_by_fi.get(fi_id, 0) + 1
+        key = (fi_id, p.get("membre_fi_id"))
+        presents_by_membre[key] = presents_by_membre.get(key, 0) + 1
     
     # Group by secteur
     secteurs_stats = []
     for secteur in secteurs:
-        secteur_fi = [f for f in familles if f.get("secteur_id") == secteur["id"]]
-        secteur_membres = []
-        
-        for fi in secteur_fi:
-            fi_membres = [m for m in membres if m.get("fi_id") == fi["id"]]
-            secteur_membres.extend(fi_membres)
+        secteur_fi = familles_by_secteur.get(secteur["id"], [])
+        nombre_membres = sum(len(membres_by_fi.get(fi["id"], [])) for fi in secteur_fi)
         
         secteurs_stats.append({
             "secteur_id": secteur["id"],
             "secteur_nom": secteur.get("nom", "N/A"),
             "ville": secteur.get("ville", "N/A"),
             "nombre_fi": len(secteur_fi),
-            "nombre_membres": len(secteur_membres),
+            "nombre_membres": nombre_membres,
             "fi_list": [{"id": f["id"], "nom": f.get("nom", "N/A")} for f in secteur_fi]
         })
     
     # Fidélisation par FI (based on selected date or all-time)
     fi_fidelisation = []
     for fi in familles:
-        fi_membres = [m for m in membres if m.get("fi_id") == fi["id"]]
-        fi_presences = [p for p in presences if p.get("fi_id") == fi["id"]]
+        fi_membres = membres_by_fi.get(fi["id"], [])
+        presents = presents_by_fi.get(fi["id"], 0)
         
         total_membres = len(fi_membres)
         if total_membres == 0:
@@ -3813,15 +4370,13 @@ async def get_fi_detailed(ville: str = None, date: str = None, current_user: dic
         else:
             if date:
                 # Pour une date spécifique : taux de présence ce jour-là
-                presents = len([p for p in fi_presences if p.get("present")])
-                fidelisation = (presents / total_membres) * 100 if total_membres > 0 else 0
+                fidelisation = (presents / total_membres) * 100
             else:
                 # Sans date : Compte les membres avec au moins 3 présences (historique)
-                membres_fideles = 0
-                for membre in fi_membres:
-                    membre_presences = [p for p in fi_presences if p.get("membre_fi_id") == membre["id"] and p.get("present")]
-                    if len(membre_presences) >= 3:
-                        membres_fideles += 1
+                membres_fideles = sum(
+                    1 for membre in fi_membres
+                    if presents_by_membre.get((fi["id"], membre["id"]), 0) >= 3
+                )
                 fidelisation = (membres_fideles / total_membres) * 100
         
         fi_fidelisation.append({
@@ -3830,7 +4385,7 @@ async def get_fi_detailed(ville: str = None, date: str = None, current_user: dic
             "ville": fi.get("ville", "N/A"),
             "secteur_id": fi.get("secteur_id"),
             "total_membres": total_membres,
-            "total_presences": len([p for p in fi_presences if p.get("present")]),
+            "total_presences": presents,
             "fidelisation": round(fidelisation, 1)
         })
     
@@ -3846,8 +4401,18 @@ async def get_fi_detailed(ville: str = None, date: str = None, current_user: dic
     }
 
 @api_router.get("/analytics/membres-table")
-async def get_membres_table(ville: str = None, current_user: dict = Depends(get_current_user)):
-    """Get complete membres table with presences for Super Admin/Pasteur"""
+async def get_membres_table(
+    ville: str = None,
+    include_presences: bool = False,
+    presences_skip: int = 0,
+    presences_limit: int = 50,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get complete membres table with presences count for Super Admin/Pasteur
+    
+    include_presences=true ajoute la liste des présences de chaque membre
+    (de la plus récente à la plus ancienne), paginée par presences_skip / presences_limit.
+    """
     # Only super_admin, pasteur, and responsable_eglise can access
     
     # For responsable_eglise, force filter by their city
@@ -3858,43 +4423,77 @@ async def get_membres_table(ville: str = None, current_user: dict = Depends(get_
     membre_query = {}
     if ville:
         # Besoin de filtrer les membres par FI qui appartiennent à la ville
-        # On récupère d'abord les FI de la ville
-        fi_query = {"ville": ville}
-        fis = await db.familles_impact.find(fi_query, {"id": 1, "_id": 0}).to_list(1000)
-        fi_ids = [fi["id"] for fi in fis]
+        fi_ids = await db.familles_impact.distinct("id", {"ville": ville})
         if fi_ids:
-            membre_query["famille_impact_id"] = {"$in": fi_ids}
+            membre_query["fi_id"] = {"$in": fi_ids}
         else:
             # Aucune FI dans cette ville, retour vide
             return []
     
     membres = await db.membres_fi.find(membre_query, {"_id": 0}).to_list(10000)
-    presences = await db.presences_fi.find({}, {"_id": 0}).to_list(100000)
+    membre_ids = [m["id"] for m in membres if m.get("id")]
+    presences_match = {"membre_fi_id": {"$in": membre_ids}} if ville else {}
+    
+    # Presences count per membre, FI and secteur names: bulk queries joined in memory
+    presence_counts, fis = await asyncio.gather(
+        db.presences_fi.aggregate([
+            {"$match": presences_match},
+            {"$group": {"_id": "$membre_fi_id", "count": {"$sum": {"$cond": ["$present", 1, 0]}}}}
+        ]).to_list(length=None),
+        db.familles_impact.find(
+            {"id": {"$in": list({m.get("fi_id") for m in membres})}},
+            {"_id": 0, "id": 1, "nom": 1, "secteur_id": 1}
+        ).to_list(length=None)
+    )
+    presence_counts = {g["_id"]: g["count"] for g in presence_counts}
+    fis_by_id = {fi["id"]: fi for fi in fis}
+    secteurs = await db.secteurs.find(
+        {"id": {"$in": list({fi.get("secteur_id") for fi in fis})}},
+        {"_id": 0, "id": 1, "nom": 1}
+    ).to_list(length=None)
+    secteurs_by_id = {secteur["id"]: secteur for secteur in secteurs}
+    
+    presences_by_membre = {}
+    if include_presences:
+        presence_pages = await db.presences_fi.aggregate([
+            {"$match": presences_match},
+            {"$sort": {"date": -1}},
+            {"$project": {"_id": 0}},
+            {"$group": {"_id": "$membre_fi_id", "presences": {"$push": "$$ROOT"}}},
+            {"$project": {"presences": {"$slice": ["$presences", max(presences_skip, 0), max(presences_limit, 1)]}}}
+        ]).to_list(length=None)
+        presences_by_membre = {g["_id"]: g["presences"] for g in presence_pages}
     
     enriched_membres = []
     for membre in membres:
-        # Get FI info
-        fi = await db.familles_impact.find_one({"id": membre.get("fi_id")}, {"_id": 0})
-        fi_nom = fi.get("nom", "N/A") if fi else "N/A"
+        fi = fis_by_id.get(membre.get("fi_id"))
+        secteur = secteurs_by_id.get(fi.get("secteur_id")) if fi else None
         
-        # Get secteur info
-        secteur = await db.secteurs.find_one({"id": fi.get("secteur_id")}, {"_id": 0}) if fi else None
-        secteur_nom = secteur.get("nom", "N/A") if secteur else "N/A"
-        
-        # Get presences for this membre
-        membre_presences = [p for p in presences if p.get("membre_fi_id") == membre["id"]]
-        presences_count = len([p for p in membre_presences if p.get("present")])
-        
-        enriched_membres.append({
+        enriched = {
             **membre,
-            "fi_nom": fi_nom,
-            "secteur_nom": secteur_nom,
-            "presences": membre_presences,
-            "presences_count": presences_count
-        })
+            "fi_nom": fi.get("nom", "N/A") if fi else "N/A",
+            "secteur_nom": secteur.get("nom", "N/A") if secteur else "N/A",
+            "presences_count": presence_counts.get(membre.get("id"), 0)
+        }
+        if include_presences:
+            enriched["presences"] = presences_by_membre.get(membre.get("id"), [])
+        enriched_membres.append(enriched)
     
     return enriched_membres
 
+def presences_dimanche_match(start_date: Optional[str], end_date: Optional[str], ville: Optional[str]) -> tuple:
+    """Filtre des visiteurs actifs ayant une présence dimanche dans la période, et filtre de date associé"""
+    query = {"tracking_stopped": False}
+    if ville and ville != "all":
+        query["city"] = ville
+    date_range = {"$type": "string"}
+    if start_date:
+        date_range["$gte"] = start_date
+    if end_date:
+        date_range["$lte"] = end_date
+    query["presences_dimanche"] = {"$elemMatch": {"date": date_range}}
+    return query, date_range
+
 @api_router.get("/analytics/presences-dimanche")
 async def get_presences_dimanche(
     start_date: Optional[str] = None,
@@ -3902,69 +4501,40 @@ async def get_presences_dimanche(
     ville: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get presences dimanche aggregated by date with NA/NC breakdown"""
-    # Only super_admin, pasteur, and responsable_eglise can access
+    """Get presences dimanche aggregated by date with NA/NC breakdown
     
-    # Get all visitors with presences_dimanche
-    query = {"tracking_stopped": False}
-    if ville and ville != "all":
-        query["city"] = ville
+    Le détail des visiteurs d'une date s'obtient via /analytics/presences-dimanche/details.
+    """
+    # Only super_admin, pasteur, and responsable_eglise can access
     
-    visitors = await db.visitors.find(query, {"_id": 0}).to_list(10000)
+    query, date_range = presences_dimanche_match(start_date, end_date, ville)
     
-    # Aggregate presences by date
-    presences_by_date = {}
+    is_present = {"$eq": ["$presence.present", True]}
+    is_na = {"$in": ["Nouveau Arrivant", "$types"]}
+    is_nc = {"$in": ["Nouveau Converti", "$types"]}
     
-    for visitor in visitors:
-        types = visitor.get("types", [])
-        is_na = "Nouveau Arrivant" in types
-        is_nc = "Nouveau Converti" in types
-        
-        for presence in visitor.get("presences_dimanche", []):
-            date = presence.get("date")
-            is_present = presence.get("present", False)
-            
-            # Filter by date range
-            if start_date and date < start_date:
-                continue
-            if end_date and date > end_date:
-                continue
-            
-            if date not in presences_by_date:
-                presences_by_date[date] = {
-                    "date": date,
-                    "total_present": 0,
-                    "total_absent": 0,
-                    "na_present": 0,
-                    "na_absent": 0,
-                    "nc_present": 0,
-                    "nc_absent": 0,
-                    "visitors_details": []
-                }
-            
-            if is_present:
-                presences_by_date[date]["total_present"] += 1
-                if is_na:
-                    presences_by_date[date]["na_present"] += 1
-                if is_nc:
-                    presences_by_date[date]["nc_present"] += 1
-            else:
-                presences_by_date[date]["total_absent"] += 1
-                if is_na:
-                    presences_by_date[date]["na_absent"] += 1
-                if is_nc:
-                    presences_by_date[date]["nc_absent"] += 1
-            
-            # Add visitor details
-            presences_by_date[date]["visitors_details"].append({
-                "name": f"{visitor.get('firstname')} {visitor.get('lastname')}",
-                "city": visitor.get("city"),
-                "types": types,
-                "present": is_present
-            })
+    def count_if(*conditions):
+        return {"$sum": {"$cond": [{"$and": list(conditions)}, 1, 0]}}
     
-    # Convert to sorted list
-    presences_list = sorted(presences_by_date.values(), key=lambda x: x["date"], reverse=True)
+    # Aggregate presences by date
+    presences_list = await db.visitors.aggregate([
+        {"$match": query},
+        {"$project": {"_id": 0, "types": {"$ifNull": ["$types", []]}, "presence": "$presences_dimanche"}},
+        {"$unwind": "$presence"},
+        {"$match": {"presence.date": date_range}},
+        {"$group": {
+            "_id": "$presence.date",
+            "total_present": count_if(is_present),
+            "total_absent": count_if({"$not": [is_present]}),
+            "na_present": count_if(is_present, is_na),
+            "na_absent": count_if({"$not": [is_present]}, is_na),
+            "nc_present": count_if(is_present, is_nc),
+            "nc_absent": count_if({"$not": [is_present]}, is_nc)
+        }},
+        {"$sort": {"_id": -1}},
+        {"$addFields": {"date": "$_id"}},
+        {"$project": {"_id": 0}}
+    ]).to_list(length=None)
     
     # Calculate totals
     total_dimanches = len(presences_list)
@@ -3983,8 +4553,76 @@ async def get_presences_dimanche(
             "avg_per_dimanche": round(avg_per_dimanche, 1)
         }
     }
+
+@api_router.get("/analytics/presences-dimanche/details")
+async def get_presences_dimanche_details(
+    date: str,
+    ville: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Détail des visiteurs (présents et absents) pour un dimanche donné"""
+    query, date_range = presences_dimanche_match(date, date, ville)
+    
+    return await db.visitors.aggregate([
+        {"$match": query},
+        {"$project": {
+            "_id": 0,
+            "firstname": 1,
+            "lastname": 1,
+            "city": 1,
+            "types": {"$ifNull": ["$types", []]},
+            "presence": "$presences_dimanche"
+        }},
+        {"$unwind": "$presence"},
+        {"$match": {"presence.date": date}},
+        {"$project": {
+            "name": {"$concat": [{"$ifNull": ["$firstname", ""]}, " ", {"$ifNull": ["$lastname", ""]}]},
+            "city": 1,
+            "types": 1,
+            "present": {"$eq": ["$presence.present", True]}
+        }}
+    ]).to_list(length=None)
+
 # ==================== CULTE STATISTICS ====================
 
+CULTE_TYPES = {
+    "culte_1": "Culte 1",
+    "culte_2": "Culte 2",
+    "ejp": "EJP",
+    "evenements_speciaux": "Événements spéciaux"
+}
+
+def culte_key(type_culte: Optional[str]) -> Optional[str]:
+    """Clé normalisée d'un type de culte ("Culte 1" -> "culte_1"), None si inconnu"""
+    label = (type_culte or "").lower()
+    if "ejp" in label:
+        return "ejp"
+    if "1" in label:
+        return "culte_1"
+    if "2" in label:
+        return "culte_2"
+    if "evenement" in label or "événement" in label or "spéciaux" in label:
+        return "evenements_speciaux"
+    return None
+
+def normalize_culte_type(doc: dict) -> dict:
+    """Stocke le libellé canonique et la clé du type de culte"""
+    key = culte_key(doc.get("type_culte"))
+    doc["culte_key"] = key
+    if key:
+        doc["type_culte"] = CULTE_TYPES[key]
+    return doc
+
+@data_migration("culte_stats_type_keys")
+async def migrate_culte_type_keys():
+    """Normalise type_culte / culte_key pour chaque libellé distinct"""
+    updated = 0
+    for type_culte in await db.culte_stats.distinct("type_culte"):
+        fields = normalize_culte_type({"type_culte": type_culte})
+        result = await db.culte_stats.update_many({"type_culte": type_culte}, {"$set": fields})
+        updated += result.modified_count
+    return {"culte_stats": updated}
+
 @api_router.post("/culte-stats")
 async def create_culte_stats(stats: CulteStatsCreate, current_user: dict = Depends(get_current_user)):
     """Create culte statistics - Accueil, Pasteur, and Responsable Église can create for their city"""
@@ -3998,7 +4636,8 @@ async def create_culte_stats(stats: CulteStatsCreate, current_user: dict = Depen
         **stats.model_dump(),
         created_by=current_user["username"]
     )
-    doc = culte_stat.model_dump()
+    doc = normalize_culte_type(culte_stat.model_dump())
+    doc['date'] = canonical_day(doc['date'])
     doc['created_at'] = doc['created_at'].isoformat()
     if doc.get('updated_at'):
         doc['updated_at'] = doc['updated_at'].isoformat()
@@ -4081,6 +4720,8 @@ async def update_culte_stats(
     # Only accueil, pasteur, responsable_eglise and super_admin can update
     
     update_dict = {k: v for k, v in updates.dict(exclude_unset=True).items() if v is not None}
+    if "culte_key" not in stat:
+        update_dict.update(normalize_culte_type({"type_culte": stat.get("type_culte")}))
     update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
     
     await db.culte_stats.update_one({"id": stat_id}, {"$set": update_dict})
@@ -4124,47 +4765,26 @@ async def get_culte_stats_summary(
         else:
             query["date"] = {"$lte": end_date}
     
-    stats = await db.culte_stats.find(query, {"_id": 0}).to_list(10000)
-    
-    # Aggregate by date (dimanche)
-    by_date = {}
-    for stat in stats:
-        date = stat["date"]
-        if date not in by_date:
-            by_date[date] = {
-                "date": date,
-                "ville": stat["ville"],
-                "culte_1": {"fideles": 0, "stars": 0},
-                "culte_2": {"fideles": 0, "stars": 0},
-                "ejp": {"fideles": 0, "stars": 0},
-                "evenements_speciaux": {"fideles": 0, "stars": 0},
-                "total_fideles": 0,
-                "total_stars": 0,
-                "total_general": 0
-            }
-        
-        culte_type = stat["type_culte"].lower().replace(" ", "_").replace("é", "e")
-        if "ejp" in culte_type.lower():
-            culte_type = "ejp"
-        elif "1" in culte_type:
-            culte_type = "culte_1"
-        elif "2" in culte_type:
-            culte_type = "culte_2"
-        elif "evenement" in culte_type or "spéciaux" in stat["type_culte"].lower():
-            culte_type = "evenements_speciaux"
-        
-        # Only add to known types to avoid KeyError
-        if culte_type in by_date[date]:
-            by_date[date][culte_type]["fideles"] = stat["nombre_fideles"]
-            by_date[date][culte_type]["stars"] = stat["nombre_stars"]
-        
-        # Always add to totals
-        by_date[date]["total_fideles"] += stat["nombre_fideles"]
-        by_date[date]["total_stars"] += stat["nombre_stars"]
-        by_date[date]["total_general"] = by_date[date]["total_fideles"] + by_date[date]["total_stars"]
-    
-    # Convert to list and sort
-    summary_list = sorted(by_date.values(), key=lambda x: x["date"], reverse=True)
+    # Aggregate by date (dimanche), une colonne par type de culte
+    group = {"_id": "$date", "ville": {"$first": "$ville"}}
+    project = {"_id": 0, "date": "$_id", "ville": 1}
+    for key in CULTE_TYPES:
+        is_key = {"$eq": ["$culte_key", key]}
+        group[f"{key}_fideles"] = {"$sum": {"$cond": [is_key, "$nombre_fideles", 0]}}
+        group[f"{key}_stars"] = {"$sum": {"$cond": [is_key, "$nombre_stars", 0]}}
+        project[key] = {"fideles": f"${key}_fideles", "stars": f"${key}_stars"}
+    group["total_fideles"] = {"$sum": "$nombre_fideles"}
+    group["total_stars"] = {"$sum": "$nombre_stars"}
+    project["total_fideles"] = 1
+    project["total_stars"] = 1
+    project["total_general"] = {"$add": ["$total_fideles", "$total_stars"]}
+    
+    summary_list = await db.culte_stats.aggregate([
+        {"$match": query},
+        {"$group": group},
+        {"$sort": {"_id": -1}},
+        {"$project": project}
+    ]).to_list(length=None)
     
     # Calculate global stats
     total_dimanches = len(summary_list)
@@ -4249,6 +4869,7 @@ async def import_all_data(data: dict, current_user: dict = Depends(get_current_u
         await db.cities.delete_many({})
         await db.users.delete_many({})
         await db.visitors.delete_many({})
+        await db.visitor_presences.delete_many({})
         await db.secteurs.delete_many({})
         await db.familles_impact.delete_many({})
         await db.membres_fi.delete_many({})
@@ -4263,6 +4884,8 @@ async def import_all_data(data: dict, current_user: dict = Depends(get_current_u
             await db.users.insert_many(data["users"])
         if data.get("visitors"):
             await db.visitors.insert_many(data["visitors"])
+            await sync_visitor_presences(data["visitors"])
+            await migrate_visitors_promo_fields()
         if data.get("secteurs"):
             await db.secteurs.insert_many(data["secteurs"])
         if data.get("familles_impact"):
@@ -4276,6 +4899,11 @@ async def import_all_data(data: dict, current_user: dict = Depends(get_current_u
         if data.get("notifications"):
             await db.notifications.insert_many(data["notifications"])
         
+        await migrate_canonical_dates()
+        await migrate_culte_type_keys()
+        await rebuild_promo_rollups()
+        await recompute_discipolat_scores()
+        
         return {
             "success": True,
             "message": "Data imported successfully",
@@ -4536,6 +5164,54 @@ async def export_credentials(current_user: dict = Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'export: {str(e)}")
 
+@api_router.get("/admin/indexes/report")
+async def get_indexes_report(current_user: dict = Depends(get_current_user)):
+    """Rapport des index manquants, non déclarés et jamais utilisés (super_admin)"""
+    if current_user["role"] != "super_admin":
+        raise HTTPException(status_code=403, detail="Only super_admin can view indexes")
+    
+    return await get_index_report()
+
+@api_router.post("/admin/indexes/ensure")
+async def ensure_indexes_endpoint(current_user: dict = Depends(get_current_user)):
+    """Crée les index déclarés manquants (super_admin)"""
+    if current_user["role"] != "super_admin":
+        raise HTTPException(status_code=403, detail="Only super_admin can manage indexes")
+    
+    return await ensure_indexes()
+
+@api_router.post("/admin/migrations/run")
+async def run_migrations_endpoint(force: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    """Exécute les migrations de données en attente; force = noms séparés par des virgules à rejouer"""
+    if current_user["role"] != "super_admin":
+        raise HTTPException(status_code=403, detail="Only super_admin can run migration")
+    
+    forced = [name.strip() for name in force.split(",") if name.strip()] if force else []
+    try:
+        applied = await run_pending_migrations(forced)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la migration: {str(e)}")
+    
+    return {"success": True, "applied": applied}
+
+@api_router.post("/admin/kpi/recompute")
+async def recompute_kpi_endpoint(current_user: dict = Depends(get_current_user)):
+    """Recalcule scores KPI et moyennes discipolat avec les KPI_WEIGHTS actuels"""
+    if current_user["role"] != "super_admin":
+        raise HTTPException(status_code=403, detail="Only super_admin can recompute KPIs")
+    
+    updated = await recompute_discipolat_scores()
+    return {"success": True, "updated": updated}
+
+@api_router.post("/admin/promo-rollups/rebuild")
+async def rebuild_promo_rollups_endpoint(ville: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    """Recalcule promo_rollups depuis les visiteurs (toutes les villes ou une seule)"""
+    if current_user["role"] != "super_admin":
+        raise HTTPException(status_code=403, detail="Only super_admin can rebuild rollups")
+    
+    rows = await rebuild_promo_rollups(ville)
+    return {"success": True, "rows": rows}
+
 @api_router.post("/admin/migrate-presences")
 async def migrate_presences(current_user: dict = Depends(get_current_user)):
     """
@@ -4606,6 +5282,12 @@ async def migrate_presences(current_user: dict = Depends(get_current_user)):
                         }
                     }
                 )
+                await sync_visitor_presences([{
+                    "id": visitor_id,
+                    "presences_dimanche": real_dimanche,
+                    "presences_jeudi": presences_jeu
+                }])
+                await refresh_promo_rollup(visitor, visitor_id)
                 
                 visitor_name = f"{visitor.get('firstname', '')} {visitor.get('lastname', '')}"
                 migration_details.append({
@@ -5776,13 +6458,14 @@ async def create_berger_presences_batch(
     created_count = 0
     for presence in batch.presences:
         presence_data = presence.model_dump()
+        presence_data["date"] = canonical_day(presence.date)
         presence_data["id"] = str(uuid4())
         presence_data["created_at"] = datetime.now(timezone.utc).isoformat()
         
         # Vérifier si une présence existe déjà pour ce berger à cette date
         existing = await db.berger_presences.find_one({
             "berger_id": presence.berger_id,
-            "date": presence.date
+            "date": presence_data["date"]
         })
         
         if existing:
@@ -5808,7 +6491,7 @@ async def get_berger_presences(
     """Obtenir les présences des bergers pour une date donnée"""
     
     presences = await db.berger_presences.find({
-        "date": date,
+        "date": canonical_day(date),
         "ville": ville
     }, {"_id": 0}).to_list(100)
     
@@ -6143,6 +6826,22 @@ async def startup_initialize_cities():
         print(f"⚠️ Warning: Could not initialize cities: {e}")
         import traceback
         traceback.print_exc()
+    
+    try:
+        print("🗂️ Ensuring database indexes...")
+        result = await ensure_indexes()
+        print(f"✅ Indexes ensured: {len(result['ensured'])} ok, {len(result['replaced'])} replaced, {len(result['errors'])} errors")
+        for error in result["errors"]:
+            print(f"  ⚠️ {error['collection']}.{error['index']}: {error['error']}")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not ensure indexes: {e}")
+    
+    try:
+        applied = await run_pending_migrations()
+        for migration in applied:
+            print(f"✅ Migration {migration['name']}: {migration['details']}")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not run data migrations: {e}")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
@@ -6194,6 +6893,7 @@ class Star(BaseModel):
     departements: List[str]
     ville: str
     statut: str = "actif"  # actif ou non_actif
+    birthday_doy: Optional[int] = None  # Jour de l'année de l'anniversaire (calendrier bissextile)
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 class StarUpdate(BaseModel):
@@ -6206,6 +6906,44 @@ class StarUpdate(BaseModel):
 
 # ==================== EVANGELISATION ENDPOINTS ====================
 
+EVANGELISATION_FIELDS = [
+    ("gagneurs_ame", "nombre_gagneurs_ame"),
+    ("personnes_receptives", "nombre_personnes_receptives"),
+    ("priere_salut", "nombre_priere_salut"),
+    ("contacts_pris", "nombre_contacts_pris"),
+    ("ames_invitees", "nombre_ames_invitees"),
+    ("miracles", "nombre_miracles"),
+]
+
+async def evangelisation_totals(ville: Optional[str], year: Optional[int] = None, month: Optional[int] = None) -> dict:
+    """Totaux eglise / familles_impact d'une ville (ou de toutes) sur une période, mis en cache"""
+    cache = response_cache("evangelisation_totals", ttl=300)
+    cache_key = (ville, year, month)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    query = {}
+    if ville:
+        query["ville"] = ville
+    if year:
+        query["date"] = period_range(year, month)
+    
+    group = {"_id": None, "total_records": {"$sum": 1}}
+    for key, field in EVANGELISATION_FIELDS:
+        group[f"eglise_{key}"] = {"$sum": f"$eglise.{field}"}
+        group[f"fi_{key}"] = {"$sum": f"$familles_impact.{field}"}
+    rows = await db.evangelisation.aggregate([{"$match": query}, {"$group": group}]).to_list(1)
+    totals = rows[0] if rows else {}
+    
+    result = {
+        "eglise": {field: totals.get(f"eglise_{key}", 0) for key, field in EVANGELISATION_FIELDS},
+        "familles_impact": {field: totals.get(f"fi_{key}", 0) for key, field in EVANGELISATION_FIELDS},
+        "total_records": totals.get("total_records", 0)
+    }
+    cache[cache_key] = result
+    return result
+
 @api_router.post("/evangelisation")
 async def create_evangelisation_record(record: EvangelisationRecord, current_user: dict = Depends(get_current_user)):
     """Create evangelisation record"""
@@ -6216,7 +6954,9 @@ async def create_evangelisation_record(record: EvangelisationRecord, current_use
     
     # Convert to dict and save
     record_dict = record.model_dump()
+    record_dict["date"] = canonical_day(record_dict["date"])
     await db.evangelisation.insert_one(record_dict)
+    invalidate_cache("evangelisation_totals", lambda key: key[0] in (None, record.ville))
     
     return {"message": "Record created successfully", "id": record.id}
 
@@ -6257,53 +6997,11 @@ async def get_evangelisation_stats(
 ):
     """Get evangelisation statistics"""
     
-    query = {}
-    
     # Filter by ville
     if current_user["role"] == "responsable_eglise":
-        query["ville"] = current_user.get("city")
-    elif ville:
-        query["ville"] = ville
+        ville = current_user.get("city")
     
-    # Date filters
-    if year and month:
-        query["date"] = {"$regex": f"^{year}-{month:02d}"}
-    elif year:
-        query["date"] = {"$regex": f"^{year}"}
-    
-    records = await db.evangelisation.find(query).to_list(1000)
-    
-    # Calculate totals
-    stats = {
-        "eglise": {
-            "nombre_gagneurs_ame": 0,
-            "nombre_personnes_receptives": 0,
-            "nombre_priere_salut": 0,
-            "nombre_contacts_pris": 0,
-            "nombre_ames_invitees": 0,
-            "nombre_miracles": 0
-        },
-        "familles_impact": {
-            "nombre_gagneurs_ame": 0,
-            "nombre_personnes_receptives": 0,
-            "nombre_priere_salut": 0,
-            "nombre_contacts_pris": 0,
-            "nombre_ames_invitees": 0,
-            "nombre_miracles": 0
-        },
-        "total_records": len(records)
-    }
-    
-    for record in records:
-        if record.get("eglise"):
-            for key in stats["eglise"]:
-                stats["eglise"][key] += record["eglise"].get(key, 0)
-        
-        if record.get("familles_impact"):
-            for key in stats["familles_impact"]:
-                stats["familles_impact"][key] += record["familles_impact"].get(key, 0)
-    
-    return stats
+    return await evangelisation_totals(ville, year, month)
 
 
 
@@ -6516,8 +7214,102 @@ async def delete_notification(notification_id: str, current_user: dict = Depends
 
 # ==================== MINISTERE STARS ENDPOINTS ====================
 
-@api_router.post("/stars")
-async def create_star(star: StarCreate, current_user: dict = Depends(get_current_user)):
+async def stars_overview(ville: Optional[str]) -> dict:
+    """Statuts, départements et stars mono/multi-départements d'une ville (ou de toutes), mis en cache"""
+    cache = response_cache("stars_overview", ttl=600)
+    cached = cache.get(ville)
+    if cached is not None:
+        return cached
+    
+    query = {"ville": ville} if ville else {}
+    facets = (await db.stars.aggregate([
+        {"$match": query},
+        {"$facet": {
+            "par_statut": [{"$group": {"_id": "$statut", "count": {"$sum": 1}}}],
+            "par_departement": [
+                {"$unwind": "$departements"},
+                {"$group": {"_id": "$departements", "count": {"$sum": 1}}}
+            ],
+            "multi": [
+                {"$match": {"departements.1": {"$exists": True}}},
+                {"$project": {"_id": 0}}
+            ],
+            "single": [
+                {"$match": {"departements": {"$size": 1}}},
+                {"$project": {
+                    "_id": 0,
+                    "prenom": 1,
+                    "nom": 1,
+                    "departement": {"$arrayElemAt": ["$departements", 0]},
+                    "statut": {"$ifNull": ["$statut", "actif"]},
+                    "ville": 1
+                }}
+            ]
+        }}
+    ]).to_list(1))[0]
+    
+    par_statut = {row["_id"]: row["count"] for row in facets["par_statut"]}
+    result = {
+        "stats": {
+            "total": sum(par_statut.values()),
+            "actifs": par_statut.get("actif", 0),
+            "non_actifs": par_statut.get("non_actif", 0),
+            "par_departement": {row["_id"]: row["count"] for row in facets["par_departement"]}
+        },
+        "multi": facets["multi"],
+        "single": facets["single"]
+    }
+    cache[ville] = result
+    return result
+
+def invalidate_stars_views(ville: Optional[str] = None):
+    """Invalide la ville donnée et la vue toutes villes (tout si ville inconnue)"""
+    if ville:
+        invalidate_cache("stars_overview", lambda key: key in (None, ville))
+        invalidate_cache("stars_anniversaires", lambda key: key[0] in (None, ville))
+    else:
+        invalidate_cache("stars_overview")
+        invalidate_cache("stars_anniversaires")
+
+# ---------- Anniversaires ----------
+# birthday_doy: jour de l'année de (mois, jour) dans un calendrier bissextile, pour que
+# le 29 février ait une place fixe et que les dates se comparent quelle que soit l'année.
+BIRTHDAY_WINDOW_DAYS = 30
+
+def birthday_doy(mois: Optional[int], jour: Optional[int]) -> Optional[int]:
+    """Jour de l'année (1-366) d'un anniversaire, None si la date est invalide"""
+    try:
+        return datetime(2000, int(mois), int(jour)).timetuple().tm_yday
+    except (TypeError, ValueError):
+        return None
+
+def birthday_window_query(today, days: int = BIRTHDAY_WINDOW_DAYS) -> dict:
+    """Filtre birthday_doy couvrant [today, today + days], y compris à cheval sur deux années"""
+    start = birthday_doy(today.month, today.day)
+    end_day = today + timedelta(days=days)
+    end = birthday_doy(end_day.month, end_day.day)
+    if start <= end:
+        return {"birthday_doy": {"$gte": start, "$lte": end}}
+    return {"$or": [{"birthday_doy": {"$gte": start}}, {"birthday_doy": {"$lte": end}}]}
+
+@data_migration("stars_birthday_doy")
+async def migrate_stars_birthday_doy():
+    """Renseigne birthday_doy pour chaque couple (mois, jour) distinct"""
+    pairs = await db.stars.aggregate([
+        {"$group": {"_id": {"mois": "$mois_naissance", "jour": "$jour_naissance"}}}
+    ]).to_list(length=None)
+    updated = 0
+    for pair in pairs:
+        mois, jour = pair["_id"].get("mois"), pair["_id"].get("jour")
+        result = await db.stars.update_many(
+            {"mois_naissance": mois, "jour_naissance": jour},
+            {"$set": {"birthday_doy": birthday_doy(mois, jour)}}
+        )
+        updated += result.modified_count
+    return {"stars": updated}
+
+@api_router.post("/stars")
+async def create_star(star: StarCreate, current_user: dict = Depends(get_current_user)):
     """Créer une star (admin authentifié)"""
     # Si ville non fournie, utiliser celle de l'utilisateur connecté
     ville = star.ville if star.ville else current_user.get("city", "")
@@ -6529,10 +7321,12 @@ async def create_star(star: StarCreate, current_user: dict = Depends(get_current
         mois_naissance=star.mois_naissance,
         departements=star.departements,
         ville=ville,
-        statut="actif"
+        statut="actif",
+        birthday_doy=birthday_doy(star.mois_naissance, star.jour_naissance)
     )
     
     await db.stars.insert_one(star_obj.model_dump())
+    invalidate_stars_views(ville)
     return {"message": "Star créée avec succès", "id": star_obj.id}
 
 
@@ -6552,10 +7346,12 @@ async def create_star_public(star: StarCreate):
         mois_naissance=star.mois_naissance,
         departements=star.departements,
         ville=star.ville,
-        statut="actif"
+        statut="actif",
+        birthday_doy=birthday_doy(star.mois_naissance, star.jour_naissance)
     )
     
     await db.stars.insert_one(star_obj.model_dump())
+    invalidate_stars_views(star.ville)
     return {"message": "Inscription réussie! Merci pour votre engagement.", "id": star_obj.id}
 
 
@@ -6602,16 +7398,10 @@ async def get_stars_multi_departements(current_user: dict = Depends(get_current_
     if current_user["role"] not in ["super_admin", "pasteur", "responsable_eglise", "ministere_stars", "respo_departement", "star"]:
         raise HTTPException(status_code=403, detail="Permission denied")
     
-    query = {}
-    if current_user["role"] == "responsable_eglise":
-        query["ville"] = current_user["city"]
-    
-    all_stars = await db.stars.find(query, {"_id": 0}).to_list(1000)
-    
-    # Filtrer ceux qui ont plus d'un département
-    multi_dept_stars = [s for s in all_stars if len(s.get("departements", [])) > 1]
+    ville = current_user["city"] if current_user["role"] == "responsable_eglise" else None
     
-    return multi_dept_stars
+    # Stars ayant plus d'un département
+    return (await stars_overview(ville))["multi"]
 
 
 @api_router.get("/stars/single-departement")
@@ -6620,53 +7410,17 @@ async def get_stars_single_departement(ville: str = None, current_user: dict = D
     if current_user["role"] not in ["super_admin", "pasteur", "responsable_eglise", "ministere_stars", "respo_departement", "star"]:
         raise HTTPException(status_code=403, detail="Permission denied")
     
-    query = {}
-    if ville:
-        query["ville"] = ville
-    elif current_user["role"] == "responsable_eglise":
-        query["ville"] = current_user["city"]
-    
-    all_stars = await db.stars.find(query, {"_id": 0}).to_list(1000)
-    
-    # Filtrer ceux qui ont exactement un département
-    single_dept_stars = []
-    for s in all_stars:
-        depts = s.get("departements", [])
-        if len(depts) == 1:
-            single_dept_stars.append({
-                "prenom": s.get("prenom"),
-                "nom": s.get("nom"),
-                "departement": depts[0],
-                "statut": s.get("statut", "actif"),
-                "ville": s.get("ville")
-            })
+    if not ville and current_user["role"] == "responsable_eglise":
+        ville = current_user["city"]
     
-    return single_dept_stars
+    # Stars ayant exactement un département
+    return (await stars_overview(ville))["single"]
 
 
 @api_router.get("/stars/public/single-departement")
-async def get_stars_single_departement_public(ville: str = None):
+async def get_stars_single_departement_public(request: Request, ville: str = None):
     """Récupérer les stars qui servent dans un seul département (public)"""
-    query = {}
-    if ville:
-        query["ville"] = ville
-    
-    all_stars = await db.stars.find(query, {"_id": 0}).to_list(1000)
-    
-    # Filtrer ceux qui ont exactement un département
-    single_dept_stars = []
-    for s in all_stars:
-        depts = s.get("departements", [])
-        if len(depts) == 1:
-            single_dept_stars.append({
-                "prenom": s.get("prenom"),
-                "nom": s.get("nom"),
-                "departement": depts[0],
-                "statut": s.get("statut", "actif"),
-                "ville": s.get("ville")
-            })
-    
-    return single_dept_stars
+    return etag_response(request, (await stars_overview(ville))["single"])
 
 
 @api_router.get("/stars/list")
@@ -6781,45 +7535,39 @@ async def delete_remontee(remontee_id: str, current_user: dict = Depends(get_cur
 
 
 @api_router.get("/stars/anniversaires")
-async def get_anniversaires():
-    """Récupérer les anniversaires à venir (accessible publiquement)"""
-    from datetime import datetime, timedelta, date
-    
-    today = date.today()  # Utiliser date au lieu de datetime pour éviter les problèmes d'heures
-    print(f"🎂 Date du jour: {today}")
+async def get_anniversaires(ville: Optional[str] = None):
+    """Récupérer les anniversaires à venir (accessible publiquement), calculés une fois par jour"""
+    today = datetime.now().date()  # Date locale, sans les heures
+    cache = response_cache("stars_anniversaires", ttl=86400)
+    cache_key = (ville, today.isoformat())
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    # Anniversaires dans les 30 prochains jours, via l'index birthday_doy
+    query = birthday_window_query(today)
+    if ville:
+        query["ville"] = ville
+    stars = await db.stars.find(
+        query,
+        {"_id": 0, "prenom": 1, "nom": 1, "ville": 1, "jour_naissance": 1, "mois_naissance": 1}
+    ).to_list(length=None)
     
-    # Anniversaires dans les 30 prochains jours
     anniversaires = []
-    all_stars = await db.stars.find({}, {"_id": 0}).to_list(1000)
-    print(f"📋 Nombre de stars en base: {len(all_stars)}")
-    
-    for star in all_stars:
+    for star in stars:
         jour = star.get("jour_naissance")
         mois = star.get("mois_naissance")
         
-        if not jour or not mois:
-            continue
-        
-        # Créer une date d'anniversaire pour cette année
+        # Date d'anniversaire cette année, ou l'année prochaine si déjà passée
         try:
-            anniv_date = date(today.year, mois, jour)
-        except ValueError:
+            anniv_date = datetime(today.year, mois, jour).date()
+            if anniv_date < today:
+                anniv_date = datetime(today.year + 1, mois, jour).date()
+        except (TypeError, ValueError):
             continue
         
-        # Si l'anniversaire est passé cette année, vérifier l'année prochaine
-        if anniv_date < today:
-            try:
-                anniv_date = date(today.year + 1, mois, jour)
-            except ValueError:
-                continue
-        
-        # Calculer les jours jusqu'à l'anniversaire
         days_until = (anniv_date - today).days
-        
-        print(f"  {star.get('prenom')} {star.get('nom')}: {jour}/{mois} - jours restants: {days_until}")
-        
-        if 0 <= days_until <= 30:  # 30 jours maximum
-            print(f"    ✅ Ajouté aux anniversaires!")
+        if 0 <= days_until <= BIRTHDAY_WINDOW_DAYS:
             anniversaires.append({
                 "prenom": star.get("prenom"),
                 "nom": star.get("nom"),
@@ -6833,6 +7581,7 @@ async def get_anniversaires():
     # Trier par jours jusqu'à l'anniversaire
     anniversaires.sort(key=lambda x: x["days_until"])
     
+    cache[cache_key] = anniversaires
     return anniversaires
 
 
@@ -6848,6 +7597,17 @@ async def update_star(star_id: str, update: StarUpdate, current_user: dict = Dep
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
+    # Garder birthday_doy aligné sur jour / mois de naissance
+    if "jour_naissance" in update_data or "mois_naissance" in update_data:
+        current = await db.stars.find_one(
+            {"id": star_id},
+            {"_id": 0, "jour_naissance": 1, "mois_naissance": 1}
+        ) or {}
+        update_data["birthday_doy"] = birthday_doy(
+            update_data.get("mois_naissance", current.get("mois_naissance")),
+            update_data.get("jour_naissance", current.get("jour_naissance"))
+        )
+    
     result = await db.stars.update_one(
         {"id": star_id},
         {"$set": update_data}
@@ -6856,6 +7616,7 @@ async def update_star(star_id: str, update: StarUpdate, current_user: dict = Dep
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Star not found")
     
+    invalidate_stars_views()
     return {"message": "Star mise à jour"}
 
 
@@ -6870,6 +7631,7 @@ async def delete_star(star_id: str, current_user: dict = Depends(get_current_use
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Star not found")
     
+    invalidate_stars_views()
     return {"message": "Star supprimée"}
 
 
@@ -6879,77 +7641,26 @@ async def get_stars_stats(ville: Optional[str] = None, current_user: dict = Depe
     if current_user["role"] not in ["super_admin", "pasteur", "responsable_eglise", "ministere_stars", "respo_departement", "star"]:
         raise HTTPException(status_code=403, detail="Permission denied")
     
-    query = {}
-    
     # Filtrer par ville si spécifié
-    if ville and ville != 'all':
-        query["ville"] = ville
-    elif current_user["role"] == "responsable_eglise":
-        query["ville"] = current_user["city"]
-    elif current_user["role"] == "respo_departement":
-        query["ville"] = current_user["city"]
-    
-    all_stars = await db.stars.find(query, {"_id": 0}).to_list(1000)
-    
-    total = len(all_stars)
-    actifs = len([s for s in all_stars if s.get("statut") == "actif"])
-    non_actifs = len([s for s in all_stars if s.get("statut") == "non_actif"])
-    
-    # Compter par département
-    dept_counts = {}
-    for star in all_stars:
-        for dept in star.get("departements", []):
-            dept_counts[dept] = dept_counts.get(dept, 0) + 1
+    if ville == 'all':
+        ville = None
+    if not ville and current_user["role"] in ["responsable_eglise", "respo_departement"]:
+        ville = current_user["city"]
     
-    return {
-        "total": total,
-        "actifs": actifs,
-        "non_actifs": non_actifs,
-        "par_departement": dept_counts
-    }
+    return (await stars_overview(ville))["stats"]
 
 
 # ========== ENDPOINTS PUBLICS MINISTÈRE DES STARS ==========
 
 @api_router.get("/stars/public/stats/overview")
-async def get_stars_stats_public(ville: Optional[str] = None):
+async def get_stars_stats_public(request: Request, ville: Optional[str] = None):
     """Statistiques globales des stars - Accès public"""
-    query = {}
-    if ville:
-        query["ville"] = ville
-    
-    all_stars = await db.stars.find(query, {"_id": 0}).to_list(1000)
-    
-    total = len(all_stars)
-    actifs = len([s for s in all_stars if s.get("statut") == "actif"])
-    non_actifs = len([s for s in all_stars if s.get("statut") == "non_actif"])
-    
-    # Compter par département
-    dept_counts = {}
-    for star in all_stars:
-        for dept in star.get("departements", []):
-            dept_counts[dept] = dept_counts.get(dept, 0) + 1
-    
-    return {
-        "total": total,
-        "actifs": actifs,
-        "non_actifs": non_actifs,
-        "par_departement": dept_counts
-    }
+    return etag_response(request, (await stars_overview(ville))["stats"])
 
 @api_router.get("/stars/public/multi-departements")
-async def get_stars_multi_departements_public(ville: Optional[str] = None):
+async def get_stars_multi_departements_public(request: Request, ville: Optional[str] = None):
     """Récupérer les stars qui servent dans plusieurs départements - Accès public"""
-    query = {}
-    if ville:
-        query["ville"] = ville
-    
-    all_stars = await db.stars.find(query, {"_id": 0}).to_list(1000)
-    
-    # Filtrer ceux qui ont plus d'un département
-    multi_dept_stars = [s for s in all_stars if len(s.get("departements", [])) > 1]
-    
-    return multi_dept_stars
+    return etag_response(request, (await stars_overview(ville))["multi"])
 
 
 
@@ -6987,6 +7698,46 @@ class PlanningCreate(BaseModel):
     annee: int
     entries: List[PlanningEntry]
 
+# ---------- Index inverse star -> affectations ----------
+# stars_assignments: une ligne (star_id, annee, semaine, departement, type_culte) par
+# membre d'une entrée de planning, reconstruite à chaque écriture du planning.
+SEMESTRE_WEEKS = {1: (1, 26), 2: (27, 53)}
+
+def planning_assignment_docs(planning: dict) -> List[dict]:
+    """Lignes stars_assignments d'un planning"""
+    docs = []
+    for entry in planning.get("entries") or []:
+        for star_id in set(entry.get("membre_ids") or []):
+            docs.append({
+                "star_id": star_id,
+                "annee": planning["annee"],
+                "semaine": planning["semaine"],
+                "departement": planning["departement"],
+                "type_culte": entry.get("type_culte") or ""
+            })
+    return docs
+
+async def sync_planning_assignments(departement: str, semaine: int, annee: int, planning: Optional[dict] = None):
+    """Remplace les affectations d'un planning (les supprime si planning est None)"""
+    await db.stars_assignments.delete_many({"departement": departement, "annee": annee, "semaine": semaine})
+    docs = planning_assignment_docs(planning) if planning else []
+    if docs:
+        await db.stars_assignments.insert_many(docs)
+    return len(docs)
+
+@data_migration("stars_assignments_from_plannings")
+async def migrate_stars_assignments():
+    """Construit stars_assignments depuis les plannings existants"""
+    await db.stars_assignments.delete_many({})
+    total = 0
+    projection = {"_id": 0, "departement": 1, "semaine": 1, "annee": 1, "entries": 1}
+    async for planning in db.stars_planning.find({}, projection):
+        docs = planning_assignment_docs(planning)
+        if docs:
+            await db.stars_assignments.insert_many(docs)
+        total += len(docs)
+    return {"assignments": total}
+
 @api_router.get("/stars/planning/{departement}")
 async def get_department_plannings(departement: str, annee: Optional[int] = None, current_user: dict = Depends(get_current_user)):
     """Récupérer tous les plannings d'un département (avec filtre année optionnel)"""
@@ -7030,6 +7781,8 @@ async def create_or_update_planning(planning: PlanningCreate, current_user: dict
         {"$set": planning_data},
         upsert=True
     )
+    await sync_planning_assignments(planning.departement, planning.semaine, planning.annee, planning_data)
+    invalidate_cache("stars_service_overview", lambda key: key == planning.annee)
     
     return {"message": "Planning enregistré"}
 
@@ -7046,6 +7799,8 @@ async def delete_planning(departement: str, semaine: int, annee: int, current_us
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Planning not found")
     
+    await sync_planning_assignments(departement, semaine, annee)
+    invalidate_cache("stars_service_overview", lambda key: key == annee)
     return {"message": "Planning supprimé"}
 
 
@@ -7061,73 +7816,117 @@ async def check_star_conflict(
     if current_user["role"] not in ["super_admin", "pasteur", "responsable_eglise", "ministere_stars", "respo_departement"]:
         raise HTTPException(status_code=403, detail="Permission denied")
     
-    # Récupérer tous les plannings de cette semaine (sauf le département actuel)
-    plannings = await db.stars_planning.find(
+    # Affectation de la star dans un autre département la même semaine
+    conflict = await db.stars_assignments.find_one(
         {
-            "semaine": semaine, 
+            "star_id": star_id,
             "annee": annee,
+            "semaine": semaine,
             "departement": {"$ne": departement}
         },
         {"_id": 0}
-    ).to_list(100)
+    )
     
-    # Vérifier si la star est dans un autre planning
-    for planning in plannings:
-        for entry in planning.get("entries", []):
-            membre_ids = entry.get("membre_ids", [])
-            if star_id in membre_ids:
-                return {
-                    "has_conflict": True,
-                    "conflict_department": planning.get("departement"),
-                    "conflict_culte": entry.get("type_culte", "")
-                }
+    if conflict:
+        return {
+            "has_conflict": True,
+            "conflict_department": conflict["departement"],
+            "conflict_culte": conflict.get("type_culte", "")
+        }
     
     return {"has_conflict": False}
 
 
+@api_router.get("/stars/check-conflicts")
+async def check_star_conflicts(
+    departement: str,
+    annee: int,
+    semaine: Optional[int] = None,
+    semestre: Optional[int] = None,
+    star_ids: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Vérifier en un appel les conflits d'un effectif (star_ids séparés par des virgules) pour une semaine ou un semestre.
+    Sans star_ids: conflits des stars déjà programmées dans le département, semaine par semaine."""
+    if current_user["role"] not in ["super_admin", "pasteur", "responsable_eglise", "ministere_stars", "respo_departement"]:
+        raise HTTPException(status_code=403, detail="Permission denied")
+    
+    period = {"annee": annee}
+    if semaine:
+        period["semaine"] = semaine
+    elif semestre in SEMESTRE_WEEKS:
+        first_week, last_week = SEMESTRE_WEEKS[semestre]
+        period["semaine"] = {"$gte": first_week, "$lte": last_week}
+    else:
+        raise HTTPException(status_code=400, detail="semaine ou semestre (1 ou 2) requis")
+    
+    own_weeks = None
+    if star_ids:
+        ids = [star_id.strip() for star_id in star_ids.split(",") if star_id.strip()]
+    else:
+        own = await db.stars_assignments.find(
+            {**period, "departement": departement},
+            {"_id": 0, "star_id": 1, "semaine": 1}
+        ).to_list(length=None)
+        own_weeks = {(a["star_id"], a["semaine"]) for a in own}
+        ids = list({star_id for star_id, _ in own_weeks})
+    
+    others = await db.stars_assignments.find(
+        {**period, "star_id": {"$in": ids}, "departement": {"$ne": departement}},
+        {"_id": 0}
+    ).sort([("semaine", 1), ("star_id", 1)]).to_list(length=None)
+    
+    conflicts = [
+        {
+            "star_id": a["star_id"],
+            "semaine": a["semaine"],
+            "conflict_department": a["departement"],
+            "conflict_culte": a.get("type_culte", "")
+        }
+        for a in others
+        if own_weeks is None or (a["star_id"], a["semaine"]) in own_weeks
+    ]
+    
+    return {"has_conflict": bool(conflicts), "conflicts": conflicts}
+
+
 @api_router.get("/stars/service-stats/{semaine}/{annee}")
 async def get_stars_service_stats(semaine: int, annee: int, ville: Optional[str] = None, current_user: dict = Depends(get_current_user)):
     """Récupérer les KPIs des stars en service pour une semaine donnée (tous départements)"""
     if current_user["role"] not in ["super_admin", "pasteur", "responsable_eglise", "ministere_stars", "respo_departement", "star"]:
         raise HTTPException(status_code=403, detail="Permission denied")
     
-    # Récupérer tous les plannings de cette semaine
-    plannings = await db.stars_planning.find(
-        {"semaine": semaine, "annee": annee},
-        {"_id": 0}
-    ).to_list(1000)
-    
     types_culte = ['Culte 1', 'Culte 2', 'EJP', 'Tous les cultes', 'Événements spéciaux']
-    kpis_by_type = {t: {"count": 0, "membres": []} for t in types_culte}
-    all_membres = set()
-    departements_avec_planning = []
     
-    for planning in plannings:
-        dept = planning.get("departement", "")
-        if dept not in departements_avec_planning:
-            departements_avec_planning.append(dept)
-            
-        for entry in planning.get("entries", []):
-            type_culte = entry.get("type_culte")
-            membres_noms = entry.get("membres_noms", [])
-            membre_ids = entry.get("membre_ids", [])
-            
-            if type_culte and type_culte in kpis_by_type:
-                for i, nom in enumerate(membres_noms):
-                    if nom not in kpis_by_type[type_culte]["membres"]:
-                        kpis_by_type[type_culte]["membres"].append(nom)
-                        kpis_by_type[type_culte]["count"] += 1
-                    
-                    # Ajouter à la liste globale des membres
-                    all_membres.add(nom)
+    # Plannings de la semaine: départements et membres distincts par type de culte
+    facets = (await db.stars_planning.aggregate([
+        {"$match": {"semaine": semaine, "annee": annee}},
+        {"$facet": {
+            "departements": [{"$group": {"_id": {"$ifNull": ["$departement", ""]}}}, {"$sort": {"_id": 1}}],
+            "par_type_culte": [
+                {"$unwind": "$entries"},
+                {"$match": {"entries.type_culte": {"$in": types_culte}}},
+                {"$unwind": "$entries.membres_noms"},
+                {"$group": {"_id": "$entries.type_culte", "membres": {"$addToSet": "$entries.membres_noms"}}}
+            ]
+        }}
+    ]).to_list(1))[0]
+    
+    membres_by_type = {row["_id"]: sorted(row["membres"]) for row in facets["par_type_culte"]}
+    all_membres = set()
+    for membres in membres_by_type.values():
+        all_membres.update(membres)
     
     return {
         "semaine": semaine,
         "annee": annee,
         "total_stars_en_service": len(all_membres),
-        "par_type_culte": {k: {"count": v["count"], "membres": v["membres"]} for k, v in kpis_by_type.items()},
-        "departements_avec_planning": departements_avec_planning,
-        "membres_en_service": list(all_membres)
+        "par_type_culte": {
+            t: {"count": len(membres_by_type.get(t, [])), "membres": membres_by_type.get(t, [])}
+            for t in types_culte
+        },
+        "departements_avec_planning": [row["_id"] for row in facets["departements"]],
+        "membres_en_service": sorted(all_membres)
     }
 
 
@@ -7137,36 +7936,40 @@ async def get_stars_service_overview(annee: int, current_user: dict = Depends(ge
     if current_user["role"] not in ["super_admin", "pasteur", "responsable_eglise", "ministere_stars", "respo_departement", "star"]:
         raise HTTPException(status_code=403, detail="Permission denied")
     
-    # Récupérer tous les plannings de l'année
-    plannings = await db.stars_planning.find(
-        {"annee": annee},
-        {"_id": 0}
-    ).to_list(5000)
-    
-    # Regrouper par semaine
-    weeks_data = {}
-    for planning in plannings:
-        semaine = planning.get("semaine")
-        if semaine not in weeks_data:
-            weeks_data[semaine] = {"membres": set(), "departements": set()}
-        
-        weeks_data[semaine]["departements"].add(planning.get("departement", ""))
-        
-        for entry in planning.get("entries", []):
-            for nom in entry.get("membres_noms", []):
-                weeks_data[semaine]["membres"].add(nom)
+    cache = response_cache("stars_service_overview", ttl=3600, maxsize=32)
+    cached = cache.get(annee)
+    if cached is not None:
+        return cached
+    
+    # Membres et départements distincts par semaine
+    weeks = await db.stars_planning.aggregate([
+        {"$match": {"annee": annee}},
+        {"$unwind": {"path": "$entries", "preserveNullAndEmptyArrays": True}},
+        {"$unwind": {"path": "$entries.membres_noms", "preserveNullAndEmptyArrays": True}},
+        {"$group": {
+            "_id": "$semaine",
+            "membres": {"$addToSet": "$entries.membres_noms"},
+            "departements": {"$addToSet": {"$ifNull": ["$departement", ""]}}
+        }},
+        {"$project": {
+            "total_stars_en_service": {"$size": {"$setDifference": ["$membres", [None]]}},
+            "nb_departements": {"$size": "$departements"}
+        }}
+    ]).to_list(length=None)
+    weeks_data = {w["_id"]: w for w in weeks}
     
     # Créer le résumé
     result = []
     for week in range(1, 53):
-        data = weeks_data.get(week, {"membres": set(), "departements": set()})
+        data = weeks_data.get(week, {})
         result.append({
             "semaine": week,
-            "total_stars_en_service": len(data["membres"]),
-            "nb_departements": len(data["departements"]),
+            "total_stars_en_service": data.get("total_stars_en_service", 0),
+            "nb_departements": data.get("nb_departements", 0),
             "has_planning": week in weeks_data
         })
     
+    cache[annee] = result
     return result
 
 
@@ -8276,11 +9079,13 @@ async def create_bergerie_objectif(objectif: BergerieObjectifCreate, current_use
                 "updated_at": datetime.now(timezone.utc).isoformat()
             }}
         )
+        invalidate_bergerie_reproduction(objectif.ville)
         return {"message": "Objectif mis à jour", "id": existing["id"]}
     else:
         # Créer nouveau
         new_objectif = BergerieObjectif(**objectif.model_dump())
         await db.bergerie_objectifs.insert_one(new_objectif.model_dump())
+        invalidate_bergerie_reproduction(objectif.ville)
         return {"message": "Objectif créé", "id": new_objectif.id}
 
 @api_router.put("/bergerie/objectifs/{objectif_id}")
@@ -8296,6 +9101,7 @@ async def update_bergerie_objectif(objectif_id: str, objectif: BergerieObjectifC
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Objectif non trouvé")
+    invalidate_bergerie_reproduction(objectif.ville)
     return {"message": "Objectif mis à jour"}
 
 
@@ -8318,6 +9124,7 @@ async def create_bergerie_contact(contact: BergerieContactCreate, current_user:
         created_by=current_user["id"]
     )
     await db.bergerie_contacts.insert_one(new_contact.model_dump())
+    invalidate_bergerie_reproduction(contact.ville)
     return {"message": "Contact ajouté", "id": new_contact.id}
 
 # --- Endpoints Bergerie PUBLICS (sans authentification) ---
@@ -8339,6 +9146,7 @@ async def create_bergerie_contact_public(contact: BergerieContactCreate):
         created_by="public"
     )
     await db.bergerie_contacts.insert_one(new_contact.model_dump())
+    invalidate_bergerie_reproduction(contact.ville)
     return {"message": "Contact ajouté", "id": new_contact.id}
 
 @api_router.delete("/bergerie/public/contacts/{contact_id}")
@@ -8347,6 +9155,7 @@ async def delete_bergerie_contact_public(contact_id: str):
     result = await db.bergerie_contacts.delete_one({"id": contact_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Contact non trouvé")
+    invalidate_bergerie_reproduction()
     return {"message": "Contact supprimé"}
 
 @api_router.get("/bergerie/public/objectifs/{ville}/{bergerie_month}")
@@ -8376,10 +9185,12 @@ async def create_bergerie_objectif_public(objectif: BergerieObjectifCreate):
                 "updated_at": datetime.now(timezone.utc).isoformat()
             }}
         )
+        invalidate_bergerie_reproduction(objectif.ville)
         return {"message": "Objectif mis à jour", "id": existing["id"]}
     else:
         new_objectif = BergerieObjectif(**objectif.model_dump())
         await db.bergerie_objectifs.insert_one(new_objectif.model_dump())
+        invalidate_bergerie_reproduction(objectif.ville)
         return {"message": "Objectif créé", "id": new_objectif.id}
 
 @api_router.put("/bergerie/public/objectifs/{objectif_id}")
@@ -8395,6 +9206,7 @@ async def update_bergerie_objectif_public(objectif_id: str, objectif: BergerieOb
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Objectif non trouvé")
+    invalidate_bergerie_reproduction(objectif.ville)
     return {"message": "Objectif mis à jour"}
 
 @api_router.post("/bergerie/public/disciples/{visitor_id}")
@@ -8432,62 +9244,68 @@ async def update_bergerie_disciple_public(visitor_id: str, disciple: BergerieDis
         )
         await db.bergerie_disciples.insert_one(new_disciple.model_dump())
     
+    invalidate_bergerie_reproduction(ville)
     return {"message": "Statut disciple mis à jour"}
 
-@api_router.get("/bergerie/public/reproduction/{ville}/{bergerie_month}")
-async def get_bergerie_reproduction_data_public(ville: str, bergerie_month: str):
-    """Récupérer toutes les données de reproduction d'une bergerie - Public"""
-    
-    # 1. Récupérer les visiteurs assignés à cette bergerie
-    visitors = await db.visitors.find(
-        {"city": ville, "assigned_month": {"$regex": f"-{bergerie_month}$"}},
-        {"_id": 0}
-    ).to_list(500)
-    
-    # 2. Récupérer les objectifs
-    objectifs = await db.bergerie_objectifs.find(
-        {"ville": ville, "bergerie_month": bergerie_month},
-        {"_id": 0}
-    ).sort("mois_cible", 1).to_list(100)
-    
-    # 3. Récupérer les contacts
-    contacts = await db.bergerie_contacts.find(
-        {"ville": ville, "bergerie_month": bergerie_month},
-        {"_id": 0}
-    ).sort("date_contact", -1).to_list(500)
-    
-    # 4. Récupérer les statuts disciples
-    disciples = await db.bergerie_disciples.find(
-        {"ville": ville, "bergerie_month": bergerie_month},
-        {"_id": 0}
-    ).to_list(500)
-    
-    # Créer un map pour les statuts disciples
-    disciples_map = {d["visitor_id"]: d for d in disciples}
+# Champs visiteur utilisés par les vues bergerie (sans commentaires, photo, KPIs...)
+BERGERIE_VISITOR_FIELDS = [
+    "id", "firstname", "lastname", "city", "types", "phone", "email", "address", "age_range",
+    "arrival_channel", "visit_date", "assigned_month", "visitor_type", "presences_dimanche",
+    "presences_jeudi", "formation_pcnc", "formation_au_coeur_bible", "formation_star",
+    "tracking_stopped", "stop_reason", "is_ancien", "ejp"
+]
+
+def invalidate_bergerie_reproduction(ville: Optional[str] = None):
+    """Invalide les données de reproduction d'une ville (toutes si ville inconnue)"""
+    if ville:
+        invalidate_cache("bergerie_reproduction", lambda key: key[0] == ville)
+    else:
+        invalidate_cache("bergerie_reproduction")
+
+async def _get_bergerie_reproduction_internal(ville: str, bergerie_month: str) -> dict:
+    """Visiteurs, objectifs, contacts et statuts disciples d'une bergerie, mis en cache"""
+    cache = response_cache("bergerie_reproduction", ttl=120, maxsize=512)
+    cache_key = (ville, bergerie_month)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    scope = {"ville": ville, "bergerie_month": bergerie_month}
+    visitors, objectifs, contacts, disciples = await asyncio.gather(
+        db.visitors.find(
+            {"city": ville, "promo_month": bergerie_month.zfill(2)},
+            {"_id": 0, **{field: 1 for field in BERGERIE_VISITOR_FIELDS}}
+        ).to_list(length=None),
+        db.bergerie_objectifs.find(scope, {"_id": 0}).sort("mois_cible", 1).to_list(length=None),
+        db.bergerie_contacts.find(scope, {"_id": 0}).sort("date_contact", -1).to_list(length=None),
+        db.bergerie_disciples.find(scope, {"_id": 0, "visitor_id": 1, "est_disciple": 1, "date_devenu_disciple": 1}).to_list(length=None)
+    )
     
     # Enrichir les visiteurs avec leur statut disciple
+    disciples_map = {d["visitor_id"]: d for d in disciples}
     for visitor in visitors:
         visitor_disciple = disciples_map.get(visitor["id"], {})
         visitor["est_disciple"] = visitor_disciple.get("est_disciple", "Non")
         visitor["date_devenu_disciple"] = visitor_disciple.get("date_devenu_disciple")
     
-    # Calculer les stats
-    total_recus = len([v for v in visitors if not v.get("tracking_stopped")])
-    total_disciples_oui = len([v for v in visitors if v.get("est_disciple") == "Oui"])
-    total_disciples_en_cours = len([v for v in visitors if v.get("est_disciple") == "En Cours"])
-    total_evangelises = len([c for c in contacts if c.get("type_contact") == "Evangelisation"])
-    
-    return {
+    result = {
         "visitors": visitors,
         "objectifs": objectifs,
         "contacts": contacts,
         "stats": {
-            "total_recus": total_recus,
-            "total_disciples_oui": total_disciples_oui,
-            "total_disciples_en_cours": total_disciples_en_cours,
-            "total_evangelises": total_evangelises
+            "total_recus": sum(1 for v in visitors if not v.get("tracking_stopped")),
+            "total_disciples_oui": sum(1 for v in visitors if v["est_disciple"] == "Oui"),
+            "total_disciples_en_cours": sum(1 for v in visitors if v["est_disciple"] == "En Cours"),
+            "total_evangelises": sum(1 for c in contacts if c.get("type_contact") == "Evangelisation")
         }
     }
+    cache[cache_key] = result
+    return result
+
+@api_router.get("/bergerie/public/reproduction/{ville}/{bergerie_month}")
+async def get_bergerie_reproduction_data_public(ville: str, bergerie_month: str):
+    """Récupérer toutes les données de reproduction d'une bergerie - Public"""
+    return await _get_bergerie_reproduction_internal(ville, bergerie_month)
 
 @api_router.put("/bergerie/contacts/{contact_id}")
 async def update_bergerie_contact(contact_id: str, contact: BergerieContactCreate, current_user: dict = Depends(get_current_user)):
@@ -8507,6 +9325,7 @@ async def update_bergerie_contact(contact_id: str, contact: BergerieContactCreat
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Contact non trouvé")
+    invalidate_bergerie_reproduction(contact.ville)
     return {"message": "Contact mis à jour"}
 
 @api_router.delete("/bergerie/contacts/{contact_id}")
@@ -8515,6 +9334,7 @@ async def delete_bergerie_contact(contact_id: str, current_user: dict = Depends(
     result = await db.bergerie_contacts.delete_one({"id": contact_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Contact non trouvé")
+    invalidate_bergerie_reproduction()
     return {"message": "Contact supprimé"}
 
 
@@ -8568,6 +9388,7 @@ async def update_bergerie_disciple(visitor_id: str, disciple: BergerieDiscipleUp
         )
         await db.bergerie_disciples.insert_one(new_disciple.model_dump())
     
+    invalidate_bergerie_reproduction(ville)
     return {"message": "Statut disciple mis à jour"}
 
 
@@ -8629,57 +9450,7 @@ async def get_bergerie_evangelisation_stats(ville: str, current_user: dict = Dep
 @api_router.get("/bergerie/reproduction/{ville}/{bergerie_month}")
 async def get_bergerie_reproduction_data(ville: str, bergerie_month: str, current_user: dict = Depends(get_current_user)):
     """Récupérer toutes les données de reproduction d'une bergerie"""
-    
-    # 1. Récupérer les visiteurs assignés à cette bergerie
-    visitors = await db.visitors.find(
-        {"city": ville, "assigned_month": {"$regex": f"-{bergerie_month}$"}},
-        {"_id": 0}
-    ).to_list(500)
-    
-    # 2. Récupérer les objectifs
-    objectifs = await db.bergerie_objectifs.find(
-        {"ville": ville, "bergerie_month": bergerie_month},
-        {"_id": 0}
-    ).sort("mois_cible", 1).to_list(100)
-    
-    # 3. Récupérer les contacts
-    contacts = await db.bergerie_contacts.find(
-        {"ville": ville, "bergerie_month": bergerie_month},
-        {"_id": 0}
-    ).sort("date_contact", -1).to_list(500)
-    
-    # 4. Récupérer les statuts disciples
-    disciples = await db.bergerie_disciples.find(
-        {"ville": ville, "bergerie_month": bergerie_month},
-        {"_id": 0}
-    ).to_list(500)
-    
-    # Créer un map pour les statuts disciples
-    disciples_map = {d["visitor_id"]: d for d in disciples}
-    
-    # Enrichir les visiteurs avec leur statut disciple
-    for visitor in visitors:
-        visitor_disciple = disciples_map.get(visitor["id"], {})
-        visitor["est_disciple"] = visitor_disciple.get("est_disciple", "Non")
-        visitor["date_devenu_disciple"] = visitor_disciple.get("date_devenu_disciple")
-    
-    # Calculer les stats
-    total_recus = len([v for v in visitors if not v.get("tracking_stopped")])
-    total_disciples_oui = len([v for v in visitors if v.get("est_disciple") == "Oui"])
-    total_disciples_en_cours = len([v for v in visitors if v.get("est_disciple") == "En Cours"])
-    total_evangelises = len([c for c in contacts if c.get("type_contact") == "Evangelisation"])
-    
-    return {
-        "visitors": visitors,
-        "objectifs": objectifs,
-        "contacts": contacts,
-        "stats": {
-            "total_recus": total_recus,
-            "total_disciples_oui": total_disciples_oui,
-            "total_disciples_en_cours": total_disciples_en_cours,
-            "total_evangelises": total_evangelises
-        }
-    }
+    return await _get_bergerie_reproduction_internal(ville, bergerie_month)
 
 @api_router.get("/bergerie/list/{ville}")
 async def get_bergeries_list(ville: str, current_user: dict = Depends(get_current_user)):
@@ -8692,32 +9463,41 @@ async def get_bergeries_list_public(ville: str):
     return await _get_bergeries_list_internal(ville)
 
 async def _get_bergeries_list_internal(ville: str):
-    """Fonction interne pour récupérer la liste des bergeries"""
+    """Fonction interne pour récupérer la liste des bergeries (mise en cache par ville)"""
+    cache = response_cache("bergeries_list", ttl=300)
+    cached = cache.get(ville)
+    if cached is not None:
+        return cached
+    
     month_names = {
         '01': 'Janvier', '02': 'Février', '03': 'Mars', '04': 'Avril',
         '05': 'Mai', '06': 'Juin', '07': 'Juillet', '08': 'Août',
         '09': 'Septembre', '10': 'Octobre', '11': 'Novembre', '12': 'Décembre'
     }
     
-    bergeries = []
+    # Visiteurs suivis par mois de promo
+    counts = await db.visitors.aggregate([
+        {"$match": {"city": ville, "tracking_stopped": {"$ne": True}}},
+        {"$group": {"_id": "$promo_month", "count": {"$sum": 1}}}
+    ]).to_list(length=None)
+    visitors_counts = {c["_id"]: c["count"] for c in counts}
+    
+    # Bergers assignés, regroupés par mois (fin de assigned_month)
+    users = await db.users.find(
+        {"city": ville, "role": {"$in": ["referent", "berger"]}},
+        {"_id": 0, "id": 1, "username": 1, "promo_name": 1, "assigned_month": 1}
+    ).to_list(length=None)
+    bergers_by_month = {}
+    for user in users:
+        assigned_months = user.pop("assigned_month", None)
+        if not isinstance(assigned_months, list):
+            assigned_months = [assigned_months]
+        for month_num in {m[-2:] for m in assigned_months if isinstance(m, str) and re.search(r"-\d{2}$", m)}:
+            bergers_by_month.setdefault(month_num, []).append(user)
     
+    bergeries = []
     for month_num, month_name in month_names.items():
-        # Compter les visiteurs pour cette bergerie
-        visitors_count = await db.visitors.count_documents({
-            "city": ville,
-            "assigned_month": {"$regex": f"-{month_num}$"},
-            "tracking_stopped": {"$ne": True}
-        })
-        
-        # Récupérer les bergers assignés
-        bergers = await db.users.find(
-            {
-                "city": ville,
-                "role": {"$in": ["referent", "berger"]},
-                "assigned_month": {"$regex": f"-{month_num}$"}
-            },
-            {"_id": 0, "id": 1, "username": 1, "promo_name": 1}
-        ).to_list(10)
+        bergers = bergers_by_month.get(month_num, [])[:10]
         
         # Nom personnalisé s'il existe
         custom_name = None
@@ -8730,75 +9510,38 @@ async def _get_bergeries_list_internal(ville: str):
             "month_num": month_num,
             "month_name": month_name,
             "nom": custom_name or f"Bergerie {month_name}",
-            "total_personnes": visitors_count,
+            "total_personnes": visitors_counts.get(month_num, 0),
             "bergers": bergers
         })
     
+    cache[ville] = bergeries
     return bergeries
 
 
 # ========== ENDPOINTS PUBLICS - MINISTÈRE DES STARS ==========
 
 @api_router.get("/stars/public/stats")
-async def get_stars_public_stats(ville: Optional[str] = None):
+async def get_stars_public_stats(request: Request, ville: Optional[str] = None):
     """Récupérer les statistiques des Stars - Accès public"""
-    query = {}
-    if ville:
-        query["ville"] = ville
-    
-    # Total
-    total = await db.stars.count_documents(query)
-    
-    # Actifs (minuscule pour correspondre aux données)
-    query_actifs = {**query, "statut": "actif"}
-    actifs = await db.stars.count_documents(query_actifs)
-    
-    # Non actifs
-    query_non_actifs = {**query, "statut": "non_actif"}
-    non_actifs = await db.stars.count_documents(query_non_actifs)
-    
-    # Par département
-    pipeline = [
-        {"$match": query},
-        {"$unwind": "$departements"},
-        {"$group": {"_id": "$departements", "count": {"$sum": 1}}}
-    ]
-    dept_counts_cursor = db.stars.aggregate(pipeline)
-    dept_counts = {}
-    async for doc in dept_counts_cursor:
-        dept_counts[doc["_id"]] = doc["count"]
-    
-    return {
-        "total": total,
-        "actifs": actifs,
-        "non_actifs": non_actifs,
-        "par_departement": dept_counts
-    }
+    return etag_response(request, (await stars_overview(ville))["stats"])
 
 @api_router.get("/stars/public/multi-departements")
-async def get_stars_public_multi_departements(ville: Optional[str] = None):
+async def get_stars_public_multi_departements(request: Request, ville: Optional[str] = None):
     """Récupérer les stars servant dans plusieurs départements - Accès public"""
-    query = {}
-    if ville:
-        query["ville"] = ville
-    
-    # Trouver les stars avec plus d'un département
-    stars = await db.stars.find(query, {"_id": 0}).to_list(1000)
-    
+    # Stars avec plus d'un département
     multi_dept_stars = [
         {
             "prenom": s.get("prenom", ""),
             "nom": s.get("nom", ""),
             "departements": s.get("departements", [])
         }
-        for s in stars
-        if len(s.get("departements", [])) > 1
+        for s in (await stars_overview(ville))["multi"]
     ]
     
     # Trier par nombre de départements
     multi_dept_stars.sort(key=lambda x: len(x["departements"]), reverse=True)
     
-    return multi_dept_stars
+    return etag_response(request, multi_dept_stars)
 
 
 @api_router.get("/stars/public/list")
@@ -8874,7 +9617,7 @@ async def get_public_bergerie_list(ville: str):
         # Compter les visiteurs pour cette bergerie
         visitors_count = await db.visitors.count_documents({
             "city": ville,
-            "assigned_month": {"$regex": f"-{month_num}$"},
+            "promo_month": month_num,
             "tracking_stopped": {"$ne": True}
         })
         
@@ -8980,29 +9723,36 @@ STATIC_BERGERIES_DISCIPLES = [
     {"id": "bg-42", "nom": "Les Emmanuelle", "responsable": "Leaticia", "ville": "Chalon-sur-Saône", "membres_count": 6, "membres": ["Gislaine", "Mycille", "Yvana", "Rovlyne", "Ahoefa"]},
 ]
 
+@data_migration("bergeries_disciples_static_seed")
+async def seed_static_bergeries_disciples():
+    """Insère une fois les bergeries statiques absentes de bergeries_disciples"""
+    # Les membres vivent dans membres_disciples, leur nombre est calculé à la lecture
+    operations = [
+        UpdateOne(
+            {"id": static["id"]},
+            {"$setOnInsert": {k: v for k, v in static.items() if k not in ("id", "membres", "membres_count")}},
+            upsert=True
+        )
+        for static in STATIC_BERGERIES_DISCIPLES
+    ]
+    result = await db.bergeries_disciples.bulk_write(operations, ordered=False)
+    return {"inserted": result.upserted_count}
+
 @api_router.get("/bergeries-disciples/list")
 async def get_bergeries_disciples_list():
     """Récupérer la liste des groupes de disciples - Public"""
-    # Récupérer les bergeries depuis la DB
-    db_bergeries = await db.bergeries_disciples.find({}, {"_id": 0}).to_list(500)
-    
-    # Créer un set des IDs existants
-    existing_ids = {b["id"] for b in db_bergeries}
+    # Les bergeries statiques sont en DB depuis la migration bergeries_disciples_static_seed
+    all_bergeries = await db.bergeries_disciples.find({}, {"_id": 0}).sort([("ville", 1), ("nom", 1)]).to_list(500)
     
-    # Ajouter les bergeries statiques qui ne sont pas encore dans la DB
-    all_bergeries = list(db_bergeries)
-    for static in STATIC_BERGERIES_DISCIPLES:
-        if static["id"] not in existing_ids:
-            all_bergeries.append(static)
+    # Nombre de membres de toutes les bergeries en une seule agrégation
+    counts = await db.membres_disciples.aggregate([
+        {"$match": {"bergerie_id": {"$in": [b["id"] for b in all_bergeries]}}},
+        {"$group": {"_id": "$bergerie_id", "count": {"$sum": 1}}}
+    ]).to_list(length=None)
+    membres_counts = {c["_id"]: c["count"] for c in counts}
     
-    # Mettre à jour le nombre de membres pour chaque bergerie
     for b in all_bergeries:
-        membres_count = await db.membres_disciples.count_documents({"bergerie_id": b["id"]})
-        if membres_count > 0:
-            b["membres_count"] = membres_count
-    
-    # Trier par ville puis par nom
-    all_bergeries.sort(key=lambda x: (x.get("ville", ""), x.get("nom", "")))
+        b["membres_count"] = membres_counts.get(b["id"], 0)
     
     return all_bergeries
 
@@ -9028,20 +9778,12 @@ async def create_bergerie_disciple(data: dict):
 @api_router.get("/bergeries-disciples/{bergerie_id}")
 async def get_bergerie_disciple_info(bergerie_id: str):
     """Récupérer les infos d'un groupe de disciples par ID"""
-    # D'abord essayer depuis la DB
     bergerie = await db.bergeries_disciples.find_one({"id": bergerie_id}, {"_id": 0})
+    if not bergerie:
+        raise HTTPException(status_code=404, detail="Bergerie non trouvée")
     
-    if bergerie:
-        membres_count = await db.membres_disciples.count_documents({"bergerie_id": bergerie_id})
-        bergerie["membres_count"] = membres_count
-        return bergerie
-    
-    # Sinon, chercher dans la liste statique
-    for b in STATIC_BERGERIES_DISCIPLES:
-        if b["id"] == bergerie_id:
-            return b
-    
-    raise HTTPException(status_code=404, detail="Bergerie non trouvée")
+    bergerie["membres_count"] = await db.membres_disciples.count_documents({"bergerie_id": bergerie_id})
+    return bergerie
 
 @api_router.put("/bergeries-disciples/{bergerie_id}")
 async def update_bergerie_disciple(bergerie_id: str, data: dict):
@@ -9056,23 +9798,13 @@ async def update_bergerie_disciple(bergerie_id: str, data: dict):
     # Supprimer les clés None
     update_data = {k: v for k, v in update_data.items() if v is not None}
     
-    # D'abord vérifier si la bergerie existe en DB
-    existing = await db.bergeries_disciples.find_one({"id": bergerie_id})
-    
-    if existing:
-        # Mettre à jour
-        await db.bergeries_disciples.update_one(
-            {"id": bergerie_id},
-            {"$set": update_data}
-        )
-    else:
-        # C'est une bergerie statique, on la crée en DB pour pouvoir la modifier
-        for static_b in STATIC_BERGERIES_DISCIPLES:
-            if static_b["id"] == bergerie_id:
-                new_bergerie = {**static_b, **update_data, "created_at": datetime.now(timezone.utc).isoformat()}
-                new_bergerie.pop("membres", None)  # Ne pas stocker la liste des membres
-                await db.bergeries_disciples.insert_one(new_bergerie.copy())
-                break
+    # Les bergeries statiques sont en DB depuis la migration bergeries_disciples_static_seed
+    result = await db.bergeries_disciples.update_one(
+        {"id": bergerie_id},
+        {"$set": update_data}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Bergerie non trouvée")
     
     return {"message": "Bergerie modifiée avec succès"}
 
@@ -9245,21 +9977,8 @@ async def save_membre_kpi(membre_id: str, kpi: KPIDiscipolatEntry):
         "updated_by": "public"
     }
     
-    await db.kpi_membres_bergerie.update_one(
-        {"membre_id": membre_id, "mois": kpi.mois},
-        {"$set": kpi_data},
-        upsert=True
-    )
-    
-    # Mettre à jour le membre avec le score moyen
-    all_kpis = await db.kpi_membres_bergerie.find({"membre_id": membre_id}, {"_id": 0}).to_list(100)
-    if all_kpis:
-        avg_score = sum(k.get("score", 0) for k in all_kpis) / len(all_kpis)
-        avg_level = get_discipolat_level(avg_score)
-        await db.membres_disciples.update_one(
-            {"id": membre_id},
-            {"$set": {"discipolat_score": round(avg_score, 1), "discipolat_level": avg_level}}
-        )
+    # Upsert du mois et mise à jour du membre avec le score moyen
+    await save_monthly_kpi("kpi_membres_bergerie", membre_id, kpi_data)
     
     return {"message": "KPI saved successfully", "score": score, "level": level}
 
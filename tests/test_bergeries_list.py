@@ -0,0 +1,58 @@
+"""
+Test suite for the bergeries list
+Tests /api/bergerie/list/{ville} with bergers assigned to several months
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://agenda-ministry.preview.emergentagent.com')
+
+TEST_CITY = "TEST_Bergeries"
+
+
+class TestBergeriesList:
+    """Tests for berger grouping by month"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Login and create a berger assigned to two months"""
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"username": "superadmin", "password": "superadmin123"}
+        )
+        assert response.status_code == 200, f"Login failed: {response.text}"
+        self.token = response.json()["token"]
+        self.headers = {"Authorization": f"Bearer {self.token}"}
+
+        self.username = f"TEST_berger_{uuid.uuid4().hex[:8]}"
+        response = requests.post(
+            f"{BASE_URL}/api/users",
+            json={
+                "username": self.username,
+                "password": "test123",
+                "city": TEST_CITY,
+                "role": "berger",
+                "assigned_month": ["2030-03", "2030-07"]
+            },
+            headers=self.headers
+        )
+        assert response.status_code == 200, f"User creation failed: {response.text}"
+        self.user_id = response.json()["id"]
+
+        yield
+
+        requests.delete(f"{BASE_URL}/api/users/{self.user_id}", headers=self.headers)
+
+    def test_list_assigned_berger(self):
+        """A berger assigned to a list of months appears in each of those bergeries"""
+        response = requests.get(f"{BASE_URL}/api/bergerie/list/{TEST_CITY}", headers=self.headers)
+        assert response.status_code == 200
+        bergeries = {b["month_num"]: b for b in response.json()}
+        assert len(bergeries) == 12
+
+        for month_num in ("03", "07"):
+            usernames = [b["username"] for b in bergeries[month_num]["bergers"]]
+            assert self.username in usernames, f"Berger missing from month {month_num}"
+        assert self.username not in [b["username"] for b in bergeries["05"]["bergers"]]
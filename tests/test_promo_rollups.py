@@ -0,0 +1,79 @@
+"""
+Test suite for promo_rollups behind /api/analytics/promotions-detailed
+Tests the rebuild command and incremental updates on visitor writes
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://agenda-ministry.preview.emergentagent.com')
+
+TEST_CITY = "Dijon"
+
+
+class TestPromoRollups:
+    """Tests for pre-aggregated promotions analytics"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Login and get auth token"""
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"username": "superadmin", "password": "superadmin123"}
+        )
+        assert response.status_code == 200, f"Login failed: {response.text}"
+        self.token = response.json()["token"]
+        self.headers = {"Authorization": f"Bearer {self.token}"}
+
+    def get_summary(self):
+        response = requests.get(
+            f"{BASE_URL}/api/analytics/promotions-detailed",
+            params={"ville": TEST_CITY},
+            headers=self.headers
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    def test_rebuild_rollups(self):
+        """Rebuild returns the number of rollup rows and totals stay consistent"""
+        response = requests.post(
+            f"{BASE_URL}/api/admin/promo-rollups/rebuild",
+            params={"ville": TEST_CITY},
+            headers=self.headers
+        )
+        assert response.status_code == 200
+        assert response.json()["success"] == True
+
+        data = self.get_summary()
+        assert data["summary"]["total_personnes_recues"] == sum(p["total_visitors"] for p in data["promos"])
+        assert data["summary"]["total_personnes_suivies"] == (
+            data["summary"]["total_personnes_recues"] - data["summary"]["total_suivis_arretes"]
+        )
+        print(f"SUCCESS: {data['summary']['total_promos']} promos after rebuild")
+
+    def test_incremental_create_and_delete(self):
+        """Creating then deleting a visitor moves the totals by one"""
+        before = self.get_summary()["summary"]["total_personnes_recues"]
+
+        response = requests.post(
+            f"{BASE_URL}/api/visitors/public",
+            json={
+                "firstname": "TEST_Rollup",
+                "lastname": "Visitor",
+                "city": TEST_CITY,
+                "types": ["Nouveau Arrivant"],
+                "phone": "0600000000",
+                "arrival_channel": "Par soi même",
+                "visit_date": "2030-01-06"
+            }
+        )
+        assert response.status_code == 200
+        visitor_id = response.json()["id"]
+
+        try:
+            assert self.get_summary()["summary"]["total_personnes_recues"] == before + 1
+        finally:
+            requests.delete(f"{BASE_URL}/api/visitors/public/{visitor_id}")
+
+        assert self.get_summary()["summary"]["total_personnes_recues"] == before
+        print("SUCCESS: rollups follow visitor creation and deletion")
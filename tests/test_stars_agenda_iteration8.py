@@ -53,6 +53,20 @@ class TestStarsPublicStats:
         # Note: Expected values based on test request: Total=4, Actifs=3, Non-Actifs=1
         # We verify the structure is correct, actual values depend on database state
 
+    def test_stars_public_stats_etag(self):
+        """Test public stats revalidation - same ETag returns 304"""
+        response = requests.get(f"{BASE_URL}/api/stars/public/stats?ville=Dijon")
+        assert response.status_code == 200
+        etag = response.headers.get("ETag")
+        assert etag
+
+        response = requests.get(
+            f"{BASE_URL}/api/stars/public/stats?ville=Dijon",
+            headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        print(f"ETag revalidation OK: {etag}")
+
 
 class TestStarsPublicList:
     """Test Stars public list endpoint"""
@@ -0,0 +1,102 @@
+"""
+Test suite for the stars_assignments index behind star conflict checks
+Tests /api/stars/check-conflict and the batch /api/stars/check-conflicts
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://agenda-ministry.preview.emergentagent.com')
+
+TEST_YEAR = 2030  # Année sans planning réel
+TEST_WEEK = 5
+TEST_STAR_ID = "TEST_star_assignment"
+
+
+class TestStarsAssignments:
+    """Tests for cross-department conflict detection"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Login and schedule the same star in two departments"""
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"username": "superadmin", "password": "superadmin123"}
+        )
+        assert response.status_code == 200, f"Login failed: {response.text}"
+        self.token = response.json()["token"]
+        self.headers = {"Authorization": f"Bearer {self.token}"}
+
+        for departement, type_culte in (("TEST_Accueil", "Culte 1"), ("TEST_Louange", "Culte 2")):
+            response = requests.post(
+                f"{BASE_URL}/api/stars/planning",
+                json={
+                    "departement": departement,
+                    "semaine": TEST_WEEK,
+                    "annee": TEST_YEAR,
+                    "entries": [{
+                        "type_culte": type_culte,
+                        "membre_ids": [TEST_STAR_ID],
+                        "membres_noms": ["TEST Star"]
+                    }]
+                },
+                headers=self.headers
+            )
+            assert response.status_code == 200
+
+        yield
+
+        for departement in ("TEST_Accueil", "TEST_Louange"):
+            requests.delete(
+                f"{BASE_URL}/api/stars/planning/{departement}/{TEST_WEEK}/{TEST_YEAR}",
+                headers=self.headers
+            )
+
+    def test_single_conflict(self):
+        """The star is reported as scheduled in the other department"""
+        response = requests.get(
+            f"{BASE_URL}/api/stars/check-conflict",
+            params={"star_id": TEST_STAR_ID, "semaine": TEST_WEEK, "annee": TEST_YEAR, "departement": "TEST_Accueil"},
+            headers=self.headers
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["has_conflict"] == True
+        assert data["conflict_department"] == "TEST_Louange"
+        assert data["conflict_culte"] == "Culte 2"
+
+    def test_batch_conflicts_semester(self):
+        """The batch check finds the conflict of the department roster over the semester"""
+        response = requests.get(
+            f"{BASE_URL}/api/stars/check-conflicts",
+            params={"departement": "TEST_Accueil", "annee": TEST_YEAR, "semestre": 1},
+            headers=self.headers
+        )
+        assert response.status_code == 200
+        conflicts = response.json()["conflicts"]
+        assert {"star_id": TEST_STAR_ID, "semaine": TEST_WEEK,
+                "conflict_department": "TEST_Louange", "conflict_culte": "Culte 2"} in conflicts
+        print(f"SUCCESS: {len(conflicts)} conflicts over semester 1")
+
+    def test_conflict_cleared_after_delete(self):
+        """Deleting the other planning removes the conflict"""
+        requests.delete(
+            f"{BASE_URL}/api/stars/planning/TEST_Louange/{TEST_WEEK}/{TEST_YEAR}",
+            headers=self.headers
+        )
+        response = requests.get(
+            f"{BASE_URL}/api/stars/check-conflicts",
+            params={"departement": "TEST_Accueil", "annee": TEST_YEAR, "semaine": TEST_WEEK, "star_ids": TEST_STAR_ID},
+            headers=self.headers
+        )
+        assert response.status_code == 200
+        assert response.json()["has_conflict"] == False
+
+    def test_batch_requires_period(self):
+        """Missing week and semester returns 400"""
+        response = requests.get(
+            f"{BASE_URL}/api/stars/check-conflicts",
+            params={"departement": "TEST_Accueil", "annee": TEST_YEAR},
+            headers=self.headers
+        )
+        assert response.status_code == 400
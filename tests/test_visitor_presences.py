@@ -0,0 +1,83 @@
+"""
+Test suite for the normalized visitor_presences collection
+Tests add_presence, /presences/by-date and the visitor presence history
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://agenda-ministry.preview.emergentagent.com')
+
+TEST_DATE = "2030-01-06"  # Dimanche sans donnée réelle
+
+
+class TestVisitorPresences:
+    """Tests for presence writes and indexed presence lookups"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Login and pick a visitor of the user's city"""
+        response = requests.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"username": "superadmin", "password": "superadmin123"}
+        )
+        assert response.status_code == 200, f"Login failed: {response.text}"
+        data = response.json()
+        self.token = data["token"]
+        self.headers = {"Authorization": f"Bearer {self.token}"}
+        city = data["user"].get("city")
+
+        visitors = requests.get(f"{BASE_URL}/api/visitors", headers=self.headers).json()
+        visitors = [v for v in visitors if v.get("city") == city]
+        if not visitors:
+            pytest.skip("No visitor available in the user's city")
+        self.visitor = visitors[0]
+
+    def test_presence_update_is_idempotent(self):
+        """Marking the same date twice keeps a single history entry"""
+        for present in (True, False):
+            response = requests.post(
+                f"{BASE_URL}/api/visitors/{self.visitor['id']}/presence",
+                json={"date": TEST_DATE, "present": present, "type": "dimanche"},
+                headers=self.headers
+            )
+            assert response.status_code == 200
+
+        response = requests.get(
+            f"{BASE_URL}/api/visitors/{self.visitor['id']}/presences",
+            params={"type": "dimanche"},
+            headers=self.headers
+        )
+        assert response.status_code == 200
+        entries = [p for p in response.json() if p["date"] == TEST_DATE]
+        assert len(entries) == 1
+        assert entries[0]["present"] == False
+        print(f"SUCCESS: single presence entry for {TEST_DATE}")
+
+    def test_presences_by_date(self):
+        """The visitor appears in /presences/by-date for the marked date"""
+        requests.post(
+            f"{BASE_URL}/api/visitors/{self.visitor['id']}/presence",
+            json={"date": TEST_DATE, "present": True, "type": "dimanche"},
+            headers=self.headers
+        )
+
+        response = requests.get(
+            f"{BASE_URL}/api/presences/by-date",
+            params={"date": TEST_DATE},
+            headers=self.headers
+        )
+        assert response.status_code == 200
+        entry = next((p for p in response.json() if p["visitor_id"] == self.visitor["id"]), None)
+        assert entry is not None
+        assert entry["present"] == True
+        assert entry["firstname"] == self.visitor["firstname"]
+        print(f"SUCCESS: {len(response.json())} presences on {TEST_DATE}")
+
+    def test_history_unknown_visitor(self):
+        """Unknown visitor returns 404"""
+        response = requests.get(
+            f"{BASE_URL}/api/visitors/unknown-visitor-id/presences",
+            headers=self.headers
+        )
+        assert response.status_code == 404